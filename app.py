@@ -1,6 +1,6 @@
 import streamlit as st
 import os
-from backend.engine.rag_chain import Phase4RAG
+from backend.engine.rag_chain import Phase4RAG, start_ingestion, get_ingestion_status, IngestionBusy
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -178,6 +178,34 @@ def initialize_rag():
         rag.warmup()  # Pre-load all expensive components
     return rag
 
+def _render_ingestion_status():
+    """Progress of the background rebuild; chat stays usable while it runs."""
+    job = get_ingestion_status()
+    if job is None:
+        return
+    if job["state"] in ("queued", "running"):
+        st.session_state.ingest_job_seen_running = job["id"]
+        if job["stage"] == "embedding" and job["chunks"]:
+            st.progress(job["chunks_embedded"] / job["chunks"], text=f"🧮 Embedding chunks {job['chunks_embedded']}/{job['chunks']}")
+        elif job["stage"] == "sources" and job["sources"]:
+            st.progress(job["source"] / job["sources"], text=f"⬇️ Source {job['source']}/{job['sources']}: {job['description'] or ''}")
+        else:
+            st.info(f"🏗️ Rebuilding database ({job['stage']})...")
+        if not hasattr(st, "fragment"):
+            st.button("🔄 Refresh status")
+        return
+    if st.session_state.get("ingest_job_seen_running") == job["id"]:
+        # Finished since the last poll: rerun the whole page to refresh readiness
+        st.session_state.ingest_job_seen_running = None
+        st.rerun()
+    if job["state"] == "succeeded":
+        st.success(f"✅ Database rebuilt in {job['elapsed_s']}s")
+    else:
+        st.error(f"❌ Ingestion failed: {job['error']}")
+
+# Poll every 2s without rerunning the chat on Streamlit versions with fragments
+ingestion_status = st.fragment(run_every=2)(_render_ingestion_status) if hasattr(st, "fragment") else _render_ingestion_status
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -310,19 +338,16 @@ with st.sidebar:
     else:
         st.warning("⚠️ Database missing or incomplete")
         
-    if st.button("🏗️ Rebuild Database", help="Triggers the ingestion process. This may take a few minutes and requires an internet connection."):
-        with st.status("🏗️ Rebuilding database...", expanded=True) as status:
-            st.write("🧹 Clearing old data...")
-            st.write("⬇️ Starting ingestion (including web scraping)...")
-            try:
-                from backend.data.ingest import ingest_docs
-                ingest_docs()
-                st.session_state.rag_initialized = False # Force re-init if needed
-                status.update(label="✅ Database rebuilt successfully!", state="complete", expanded=False)
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Ingestion failed: {str(e)}")
-                status.update(label="❌ Ingestion failed", state="error")
+    job = get_ingestion_status()
+    job_running = job is not None and job["state"] in ("queued", "running")
+    if st.button("🏗️ Rebuild Database", disabled=job_running, help="Starts ingestion in the background; only new or changed sources are re-embedded. Requires an internet connection."):
+        try:
+            start_ingestion()
+            st.rerun()
+        except IngestionBusy as e:
+            st.warning(f"⏳ {e}")
+
+    ingestion_status()
 
     st.divider()
     
@@ -1,13 +1,24 @@
+import time
+# Start of the cold-start clock reported as rag_startup_seconds
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import sys
+import threading
 
 # Add phase2 directory to path for absolute imports starting with 'src'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from fastapi import FastAPI, HTTPException
+import json
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from backend.engine.rag_chain import get_rag_chain, Phase4RAG
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from backend.engine.rag_chain import (
+    get_rag_chain, Phase4RAG, render_metrics, get_readiness, STARTUP_SECONDS,
+    start_ingestion, get_ingestion_status, IngestionBusy, BATCH_MAX_CONCURRENCY,
+)
 from typing import Optional
 import uvicorn
 
@@ -25,36 +36,173 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = "default"
+    include_timings: bool = False  # per-stage milliseconds in the response, for debugging
 
 class ChatResponse(BaseModel):
     answer: str
     sources: list[str] = []
     official_links: list[dict] = []
     routing: Optional[dict] = None
+    timings: Optional[dict] = None
+
+class BatchChatRequest(BaseModel):
+    messages: list[str]
+    max_concurrency: Optional[int] = Field(None, ge=1, le=BATCH_MAX_CONCURRENCY)
+
+class BatchChatItem(ChatResponse):
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    results: list[BatchChatItem]
+
+class IngestRequest(BaseModel):
+    scheme: Optional[str] = None          # only fetch this scheme's sources
+    document_type: Optional[str] = None   # only fetch this document type
+    force: bool = False                   # re-embed selected sources even if unchanged
+    full: bool = False                    # clear vector_db/ and rebuild everything
+
+# Upper bound on questions per /chat/batch call
+MAX_BATCH_SIZE = int(os.getenv("RAG_MAX_BATCH_SIZE", "500"))
 
 # Global orchestrator instance
 phase4_rag = None
 
+def _warmup():
+    try:
+        phase4_rag.warmup()
+    except Exception as e:
+        print(f"Warmup failed: {e}")
+        return
+    if all(get_readiness().values()):
+        STARTUP_SECONDS.labels("ready").set(time.perf_counter() - _IMPORT_STARTED)
+
 @app.on_event("startup")
 def startup_event():
     global phase4_rag
+    STARTUP_SECONDS.labels("import").set(time.perf_counter() - _IMPORT_STARTED)
     try:
         phase4_rag = Phase4RAG()
         print("Phase 4 RAG Orchestrator Loaded with Memory support.")
     except Exception as e:
         print(f"Error initializing Phase 4 RAG: {e}")
+        return
+    # Load the embedding model and open the index without holding up startup
+    threading.Thread(target=_warmup, name="rag-warmup", daemon=True).start()
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: embedding model, vector index and router are loaded."""
+    checks = get_readiness() if phase4_rag else {"engine": False}
+    ready = all(checks.values())
+    return JSONResponse({"ready": ready, "checks": checks}, status_code=200 if ready else 503)
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, x_rag_profile: Optional[str] = Header(None)):
     global phase4_rag
     if not phase4_rag:
         raise HTTPException(status_code=500, detail="RAG system not initialized")
     
     try:
-        result = phase4_rag.query(request.message, session_id=request.session_id)
+        result = await phase4_rag.aquery(
+            request.message, session_id=request.session_id, include_timings=request.include_timings,
+            profile=x_rag_profile == "1",
+        )
         return ChatResponse(**result)
+    except FileNotFoundError as e:
+        # No index yet, or a rebuild is running
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """Answer many independent questions in one call (no session memory)."""
+    global phase4_rag
+    if not phase4_rag:
+        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    if len(request.messages) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_SIZE} messages)")
+    
+    try:
+        results = await run_in_threadpool(
+            phase4_rag.query_many, request.messages, max_concurrency=request.max_concurrency
+        )
+        return BatchChatResponse(results=[BatchChatItem(**r) for r in results])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, x_rag_profile: Optional[str] = Header(None)):
+    """Server-Sent Events variant of /chat.
+    
+    Emits a `metadata` event (routing, sources, official_links) as soon as
+    retrieval finishes, then one `token` event per generated chunk, and a final
+    `done` event carrying the full answer. Failures mid-stream are reported as
+    an `error` event since the HTTP status has already been sent.
+    """
+    global phase4_rag
+    if not phase4_rag:
+        raise HTTPException(status_code=500, detail="RAG system not initialized")
+
+    async def event_source():
+        try:
+            async for event in phase4_rag.astream(
+                request.message, session_id=request.session_id, include_timings=request.include_timings,
+                profile=x_rag_profile == "1",
+            ):
+                name = event.pop("event")
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/ingest", status_code=202)
+def ingest(request: Optional[IngestRequest] = None):
+    """Update the vector database in the background (incremental unless `full`).
+    
+    Returns the job status (202). Only one ingest runs at a time: while one
+    is running the existing job is returned with 200 instead.
+    """
+    request = request or IngestRequest()
+    try:
+        job, started = start_ingestion(
+            scheme=request.scheme, document_type=request.document_type, full=request.full, force=request.force,
+        )
+    except IngestionBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(job, status_code=202 if started else 200)
+
+@app.get("/ingest")
+def ingest_status_latest():
+    """Status of the most recent ingestion job in this process."""
+    job = get_ingestion_status()
+    if job is None:
+        raise HTTPException(status_code=404, detail="No ingestion job has run")
+    return job
+
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    """Stage, source n of m, chunks embedded, and the outcome of a job."""
+    job = get_ingestion_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return job
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: per-stage latency histograms, cache, routing and LLM counters."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
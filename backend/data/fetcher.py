@@ -0,0 +1,163 @@
+"""Concurrent source downloads over a pooled session with conditional revalidation.
+
+Each URL's ETag and Last-Modified are kept in a small JSON state file, so a
+refetch of an unchanged document costs one 304. Files are written to a temp
+file in the target directory and renamed into place, so readers never see a
+partial download.
+"""
+import email.utils
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DOWNLOAD_WORKERS = int(os.getenv("RAG_INGEST_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_TIMEOUT = float(os.getenv("RAG_INGEST_DOWNLOAD_TIMEOUT", "30"))
+DOWNLOAD_RETRIES = int(os.getenv("RAG_INGEST_DOWNLOAD_RETRIES", "2"))
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchResult:
+    """Outcome of one fetch.
+
+    `status` is downloaded (new content written), not_modified (304, local
+    copy current), stale (request failed, older local copy kept) or failed
+    (no local copy); `path` is None only when failed.
+    """
+
+    def __init__(self, url: str, path: Optional[str], status: str, size: int = 0, error: Optional[str] = None):
+        self.url = url
+        self.path = path
+        self.status = status
+        self.size = size
+        self.error = error
+
+
+def create_session(pool_size: int = DOWNLOAD_WORKERS, retries: int = DOWNLOAD_RETRIES) -> requests.Session:
+    """Session whose connection pool fits `pool_size` concurrent downloads, retrying 429/5xx."""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SourceFetcher:
+    """Downloads URLs to `path_for(url)`, revalidating copies already on disk.
+
+    Without stored validators (e.g. files committed to the repo) the local
+    file's mtime is sent as If-Modified-Since.
+    """
+
+    def __init__(self, path_for: Callable[[str], str], state_path: str, workers: int = DOWNLOAD_WORKERS,
+                 timeout: float = DOWNLOAD_TIMEOUT, session: Optional[requests.Session] = None):
+        self.path_for = path_for
+        self.state_path = state_path
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.session = session or create_session(self.workers)
+        self._lock = threading.Lock()
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict[str, dict]:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _remember(self, url: str, response: requests.Response) -> None:
+        with self._lock:
+            entry = dict(self.state.get(url, {}))
+            # A 304 may omit validators; keep the ones we sent
+            for header, key in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+                if response.headers.get(header):
+                    entry[key] = response.headers[header]
+            entry["checked_at"] = time.time()
+            self.state[url] = entry
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def _conditional_headers(self, url: str, path: str) -> dict:
+        if not os.path.exists(path):
+            return {}
+        entry = self.state.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        headers["If-Modified-Since"] = entry.get("last_modified") or email.utils.formatdate(
+            os.path.getmtime(path), usegmt=True
+        )
+        return headers
+
+    def _write_atomic(self, path: str, response: requests.Response) -> int:
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path), suffix=".part")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            # urllib3 1.x doesn't enforce Content-Length on its own
+            expected = response.headers.get("Content-Length")
+            if expected and not response.headers.get("Content-Encoding") and int(expected) != size:
+                raise IOError(f"Incomplete download: got {size} of {expected} bytes")
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return size
+
+    def fetch(self, url: str) -> FetchResult:
+        path = self.path_for(url)
+        try:
+            with self.session.get(url, headers=self._conditional_headers(url, path),
+                                  timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    self._remember(url, response)
+                    return FetchResult(url, path, "not_modified")
+                response.raise_for_status()
+                size = self._write_atomic(path, response)
+                self._remember(url, response)
+                return FetchResult(url, path, "downloaded", size=size)
+        except (requests.RequestException, OSError) as e:
+            if os.path.exists(path):
+                return FetchResult(url, path, "stale", error=str(e))
+            return FetchResult(url, None, "failed", error=str(e))
+
+    def fetch_all(self, urls: Iterable[str], on_result: Optional[Callable[[FetchResult], None]] = None) -> Dict[str, FetchResult]:
+        """Fetch URLs concurrently; `on_result` runs on the download thread as each finishes."""
+        def run(url):
+            result = self.fetch(url)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(urls)), thread_name_prefix="rag-download") as pool:
+            return dict(zip(urls, pool.map(run, urls)))
@@ -1,14 +1,15 @@
 import os
 import sys
 import csv
-import requests
+import hashlib
+import json
+import threading
 import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse, unquote
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.documents import Document
 import shutil
 from dotenv import load_dotenv
@@ -18,78 +19,59 @@ load_dotenv(os.path.join(os.path.dirname(__file__), "../../.env"))
 
 # Configuration
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+from backend.engine.lexical_index import BM25Index
+from backend.engine.fund_facts import FundFactsStore, extract_fund_facts, merge_fund_facts
+from backend.engine.router import LocalRouter
+from backend.engine.profiling import maybe_profile
+from backend.engine.embedding_backends import EMBEDDING_MODEL_NAME, create_embeddings
+# PDF workers are spawned and re-import the main module, so the embedding model
+# and Chroma are imported where they are used
+from backend.data.pdf_parse import PDF_PARSE_WORKERS, clean_text, parse_pdf, create_parse_pool
+from backend.data.fetcher import SourceFetcher
+from backend.data.scraper import scrape_pages
+from backend.data.pipeline import Pipeline, PipelineAborted, format_summary
+
 SOURCES_CSV = os.path.join(PROJECT_ROOT, "sources.csv")
 DOWNLOAD_DIR = os.path.join(PROJECT_ROOT, "downloaded_sources")
+# ETag / Last-Modified per PDF URL, used to revalidate downloaded copies
+DOWNLOAD_STATE_FILE = os.path.join(PROJECT_ROOT, ".cache", "download_state.json")
 DB_DIR = os.path.join(PROJECT_ROOT, "vector_db")
+INDEX_VERSION_FILE = os.path.join(DB_DIR, "index_version")
+LEXICAL_INDEX_FILE = os.path.join(DB_DIR, "lexical_index.json")
+FUND_FACTS_FILE = os.path.join(DB_DIR, "fund_facts.json")
+ROUTER_CENTROIDS_FILE = os.path.join(DB_DIR, "router_centroids.json")
+MANIFEST_FILE = os.path.join(DB_DIR, "ingest_manifest.json")
+MANIFEST_VERSION = 2  # bump when parsing or fact extraction changes; 2: NAV/AUM from live pages only, whole exit-load rules
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+EMBED_BATCH_SIZE = 256  # chunks per batch handed from split to embed to upsert
 
-def download_pdf(url, download_dir):
-    """Download PDF from URL and return local file path."""
-    try:
-        # Create download directory if it doesn't exist
-        os.makedirs(download_dir, exist_ok=True)
-        
-        # Extract filename from URL
-        parsed_url = urlparse(url)
-        filename = unquote(os.path.basename(parsed_url.path))
-        
-        # If filename doesn't end with .pdf, generate one from URL
-        if not filename.endswith('.pdf'):
-            filename = f"document_{hash(url)}.pdf"
-        
-        filepath = os.path.join(download_dir, filename)
-        
-        # Skip download if file already exists
-        if os.path.exists(filepath):
-            print(f"  ✓ Already downloaded: {filename}")
-            return filepath
-        
-        # Download the file
-        print(f"  ⬇ Downloading: {filename}")
-        response = requests.get(url, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        print(f"  ✓ Downloaded: {filename}")
-        return filepath
-    
-    except Exception as e:
-        print(f"  ✗ Failed to download {url}: {e}")
-        return None
+def write_index_version():
+    """Stamp the vector DB with a fresh version id so caches keyed on it expire."""
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    with open(INDEX_VERSION_FILE, "w") as f:
+        f.write(version)
+    return version
 
-def clean_text(text):
-    """
-    Clean extracted text while preserving semantic structure.
-    Removes excessive noise but keeps numbers and labels intact.
-    """
-    import re
-    
-    # 1. Basic normalization
-    text = text.replace('\xa0', ' ') # Remove non-breaking spaces
+def local_pdf_path(url, download_dir=DOWNLOAD_DIR):
+    """Local path a PDF source is downloaded to."""
+    # Extract filename from URL
+    parsed_url = urlparse(url)
+    filename = unquote(os.path.basename(parsed_url.path))
     
-    # 2. Remove purely decorative characters but keep currency symbols
-    text = re.sub(r'[^\x00-\x7F₹]+', ' ', text)
+    # If filename doesn't end with .pdf, generate one from URL
+    if not filename.endswith('.pdf'):
+        filename = f"document_{hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]}.pdf"
     
-    # 3. Collapse multiple spaces
-    text = re.sub(r' {2,}', ' ', text)
-    
-    # 4. Handle lines and segments
-    lines = [line.strip() for line in text.split('\n')]
-    clean_lines = []
-    for line in lines:
-        if not line:
-            continue
-        # Skip lines that look like pure UI noise (very short navigation items etc)
-        # RELAXED: NAV/AUM labels are short, so let's be less aggressive
-        if len(line) < 2:
-            continue
-        clean_lines.append(line)
-        
-    return '\n'.join(clean_lines)
+    return os.path.join(download_dir, filename)
+
+def is_pdf_url(url):
+    return url.endswith('.pdf') or 'pdf' in url.lower()
+
+def create_fetcher(download_dir=DOWNLOAD_DIR, state_path=DOWNLOAD_STATE_FILE):
+    """Fetcher for PDF sources: pooled, concurrent, revalidating copies already downloaded."""
+    return SourceFetcher(lambda url: local_pdf_path(url, download_dir), state_path)
 
 def load_sources_from_csv():
     """Load document sources from sources.csv."""
@@ -106,21 +88,324 @@ def load_sources_from_csv():
                 'url': row['url'],
                 'document_type': row['document_type'],
                 'scheme': row['scheme'],
-                'description': row['description']
+                'description': row['description'],
+                # Optional readiness condition and timeout for live pages (see scraper.py)
+                'wait_for': row.get('wait_for') or '',
+                'timeout_s': row.get('timeout_s') or '',
             })
     
     print(f"Loaded {len(sources)} sources from sources.csv")
     return sources
 
-def ingest_docs():
-    """Main ingestion function that downloads and processes documents from URLs."""
-    # 1. Deduplication: Clear existing vector database
-    if os.path.exists(DB_DIR):
-        print(f"🧹 Clearing existing vector database at {DB_DIR}...")
-        shutil.rmtree(DB_DIR, ignore_errors=True)
+def _report(progress, stage, **fields):
+    if progress is not None:
+        progress(stage, **fields)
+
+def ingest_settings():
+    """Parse and embedding settings; chunks built under other settings are all rebuilt."""
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+
+def load_manifest():
+    """Per-source record of the last ingest (content hash, chunk ids, facts), or None."""
+    try:
+        with open(MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def source_metadata(source):
+    """Metadata copied onto every chunk of a source; a change re-ingests it."""
+    return {
+        "scheme": source.get('scheme', 'general'),
+        "document_type": source.get('document_type', 'General'),
+        "description": source.get('description', 'Unknown Source'),
+    }
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_id(chunk):
+    """Deterministic id, so re-ingesting an unchanged chunk upserts the same vector."""
+    meta = chunk.metadata
+    key = "\x1f".join([
+        meta.get("source", ""), str(meta.get("page", "")), str(meta.get("start_index", "")), chunk.page_content
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+def is_unchanged(entry, content_hash, metadata):
+    return entry is not None and entry.get("content_hash") == content_hash and entry.get("metadata") == metadata
+
+def ingest_docs(progress=None, scheme=None, document_type=None, full=False, force=False):
+    """Main ingestion function that downloads and processes documents from URLs.
+    
+    Incremental by default: sources whose content and metadata match the
+    manifest are skipped, changed ones have their chunks upserted (stale
+    chunks deleted), and sources removed from sources.csv are deleted.
+    `scheme` / `document_type` restrict which sources are fetched; `force`
+    re-embeds them even if unchanged; `full` clears vector_db/ first.
+    
+    `progress(stage, **fields)` is called as the run advances (see
+    backend/engine/ingest_jobs.py). Returns the index version, or None if
+    nothing was ingested. Profiled end to end when RAG_PROFILE=1.
+    """
+    with maybe_profile("ingest", sample_rate=1.0):
+        return _ingest_docs(progress, scheme, document_type, full, force)
+
+def _fetch_sources(sources, entries, force, progress, pool, emit):
+    """Download/scrape sources, calling `emit(source, content_hash, pages)` for new or changed ones.
+    
+    PDFs are downloaded concurrently and each is submitted to the parse
+    `pool` as soon as it arrives (`pages` is then a Future of the parsed
+    pages), while web pages are scraped on this thread. `emit` blocks while
+    the next stage is behind, which in turn holds back further downloads.
+    """
+    lock = threading.Lock()
+    done = 0
+    pdf_sources = {s['url']: s for s in sources if is_pdf_url(s['url'])}
+    web_sources = [s for s in sources if not is_pdf_url(s['url'])]
+    
+    def source_done(source, message):
+        nonlocal done
+        with lock:
+            done += 1
+            print(f"[{done}/{len(sources)}] {source['description']}: {message}")
+            _report(progress, "sources", source=done, description=source['description'])
+    
+    def on_download(result):
+        # Runs on a download thread
+        url = result.url
+        source = pdf_sources[url]
+        metadata = source_metadata(source)
+        if result.path is None:
+            source_done(source, f"✗ Failed to download {url}: {result.error}")
+            return
+        status = result.status if result.status != "stale" else f"refresh failed ({result.error}), using local copy"
+        try:
+            content_hash = file_sha256(result.path)
+            if not force and is_unchanged(entries.get(url), content_hash, metadata):
+                source_done(source, f"✓ Unchanged since last ingest ({status}), skipping")
+            elif pool is not None:
+                emit(source, content_hash, pool.submit(parse_pdf, result.path, url, metadata))
+                source_done(source, f"⬇ {status}, queued for parsing")
+            else:
+                docs = parse_pdf(result.path, url, metadata)
+                emit(source, content_hash, docs)
+                source_done(source, f"✓ {status}, loaded {len(docs)} pages from PDF")
+        except PipelineAborted:
+            raise
+        except Exception as e:
+            source_done(source, f"✗ Failed to process: {e}")
+    
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-download") as downloads:
+        fetched = downloads.submit(create_fetcher().fetch_all, list(pdf_sources), on_download)
+        if web_sources:
+            _scrape_pages(web_sources, entries, force, emit, source_done)
+        fetched.result()
+
+def _fetch_stage(pipeline, fetched, sources, entries, force, progress, pool):
+    stats = pipeline.stages["fetch"]
+    
+    def emit(source, content_hash, pages):
+        pipeline.put(fetched, (source, content_hash, pages), stats)
+        stats.add()
+    
+    _fetch_sources(sources, entries, force, progress, pool, emit)
+    stats.add(items=0, units=len(sources))
+    _report(progress, "embedding", description=None)
+    pipeline.close(fetched)
+
+def _split_stage(pipeline, fetched, batches, entries, force, to_delete, progress):
+    """Split each fetched source as it arrives and pass on its new chunks in batches.
+    
+    Records the source in the manifest entries and its stale chunk ids in
+    `to_delete`. Waiting on a PDF still being parsed counts as work for this
+    stage. Returns (sources changed, chunks queued for embedding).
+    """
+    stats = pipeline.stages["split"]
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, 
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True  # lets the context packer stitch overlapping neighbours
+    )
+    changed = queued = 0
+    batch = []
+    for source, content_hash, pages in pipeline.consume(fetched, stats):
+        url = source['url']
+        if isinstance(pages, Future):
+            try:
+                pages = pages.result()
+            except Exception as e:
+                print(f"  ✗ Failed to parse {url}: {e}")
+                continue
+            print(f"  ✓ Loaded {len(pages)} pages from {os.path.basename(local_pdf_path(url))}")
+        # Upsert chunks with new ids, delete ids the source no longer produces
+        chunks = {chunk_id(chunk): chunk for chunk in text_splitter.split_documents(pages)}
+        old_entry = entries.get(url, {})
+        old_ids = set(old_entry.get("chunk_ids", []))
+        to_delete.update(old_ids - chunks.keys())
+        # Chunk ids don't cover the sources.csv metadata: if only that changed,
+        # rewrite every chunk so Chroma's scheme filter sees the new values
+        rewrite = force or old_entry.get("metadata") != source_metadata(source)
+        entries[url] = {
+            "metadata": source_metadata(source),
+            "content_hash": content_hash,
+            "pages": len(pages),
+            "chunk_ids": list(chunks),
+            "facts": extract_fund_facts(pages),
+            "ingested_at": time.time(),
+        }
+        changed += 1
+        stats.add(items=0, units=len(chunks))
+        for cid, chunk in chunks.items():
+            if rewrite or cid not in old_ids:
+                batch.append((cid, chunk))
+                queued += 1
+            if len(batch) == EMBED_BATCH_SIZE:
+                pipeline.put(batches, batch, stats)
+                stats.add()
+                batch = []
+        _report(progress, None, chunks=queued)
+    if batch:
+        pipeline.put(batches, batch, stats)
+        stats.add()
+    pipeline.close(batches)
+    return changed, queued
+
+def _embed_stage(pipeline, batches, embedded, model):
+    stats = pipeline.stages["embed"]
+    for batch in pipeline.consume(batches, stats):
+        if "embeddings" not in model:
+            print("Loading embedding model...")
+            model["embeddings"] = create_embeddings()
+        vectors = model["embeddings"].embed_documents([chunk.page_content for _, chunk in batch])
+        pipeline.put(embedded, (batch, vectors), stats)
+        stats.add(units=len(batch))
+    pipeline.close(embedded)
+
+def _upsert_stage(pipeline, embedded, vectorstore, progress):
+    stats = pipeline.stages["upsert"]
+    for batch, vectors in pipeline.consume(embedded, stats):
+        # Vectors are already computed, so write them to the collection directly
+        vectorstore._collection.upsert(
+            ids=[cid for cid, _ in batch],
+            embeddings=vectors,
+            documents=[chunk.page_content for _, chunk in batch],
+            metadatas=[chunk.metadata for _, chunk in batch],
+        )
+        stats.add(units=len(batch))
+        _report(progress, None, chunks_embedded=stats.units)
+
+def _stored_chunks(vectorstore, entries, urls):
+    """Stored chunks of `urls` in manifest order, read from Chroma one source at a time."""
+    for url in urls:
+        ids = entries[url]["chunk_ids"]
+        if not ids:
+            continue
+        stored = vectorstore.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            cid: Document(page_content=text, metadata=meta or {})
+            for cid, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        yield from (by_id[cid] for cid in ids if cid in by_id)
+
+def _log_summary(pipeline, progress):
+    summary = pipeline.summary()
+    print("\nIngestion pipeline:")
+    print(format_summary(summary))
+    _report(progress, None, pipeline=summary)
+
+def _scrape_pages(sources, entries, force, emit, source_done):
+    """Render live web pages concurrently (see scraper.py); emits new or changed ones."""
+    reported = set()
+    
+    def on_result(source, result):
+        url = source['url']
+        reported.add(url)
+        if result.error:
+            source_done(source, f"✗ Failed to scrape {url}: {result.error}")
+            return
+        clean_content = clean_text(result.text)
+        print(f"  ✓ Captured dynamic content from {url} ({len(clean_content)} chars in {result.elapsed:.1f}s)")
+        if not result.ready:
+            print(f"    ⚠️ Readiness condition '{result.condition}' not met in time; using the page as rendered")
+        if len(clean_content) > 0:
+            print(f"    Sample: {clean_content[:150]}...")
+        
+        # Verification
+        if "₹" in clean_content or "NAV" in clean_content:
+            print(f"    ➡️ Found potential NAV data!")
+            nav_idx = clean_content.find("NAV")
+            if nav_idx != -1:
+                print(f"    NAV Snippet: ...{clean_content[max(0, nav_idx-50):nav_idx+100]}...")
+        else:
+            print(f"    ⚠️ Warning: No 'NAV' or '₹' found in captured content.")
         
-    all_documents = []
+        metadata = source_metadata(source)
+        content_hash = hashlib.sha256(clean_content.encode("utf-8")).hexdigest()
+        if not force and is_unchanged(entries.get(url), content_hash, metadata):
+            source_done(source, "✓ Unchanged since last ingest, skipping")
+            return
+        doc = Document(page_content=clean_content, metadata={
+            "source": url,
+            **metadata,
+            "is_live": True
+        })
+        emit(source, content_hash, [doc])
+        source_done(source, "✓ Captured live page")
+    
+    try:
+        scrape_pages(sources, on_result=on_result)
+    except PipelineAborted:
+        raise
+    except Exception as e:
+        print(f"❌ Failed to scrape web pages: {e}")
+        print("If the browser is missing, run 'playwright install chromium' manually on your server.")
+        for source in sources:
+            if source['url'] not in reported:
+                source_done(source, f"✗ Not scraped: {e}")
+
+def _clear_vector_db(manifest):
+    """Empty vector_db/ for a full rebuild, leaving `manifest` (no sources yet).
     
+    The stamp goes first so readers see a rebuild in progress, and the empty
+    manifest marks the half-built DB as ours rather than a pre-manifest one
+    for rag_chain to adopt. The collection is dropped through Chroma instead
+    of deleting the directory under clients that still hold it open (the
+    API's retrievers).
+    """
+    if os.path.exists(INDEX_VERSION_FILE):
+        os.remove(INDEX_VERSION_FILE)
+    os.makedirs(DB_DIR, exist_ok=True)
+    save_manifest(manifest)
+    if not os.path.exists(os.path.join(DB_DIR, "chroma.sqlite3")):
+        return
+    print(f"🧹 Clearing existing vector database at {DB_DIR}...")
+    from langchain_chroma import Chroma
+    try:
+        Chroma(persist_directory=DB_DIR).delete_collection()
+    except Exception as e:
+        # e.g. written by an incompatible Chroma version: nothing can read it anyway
+        print(f"⚠️ Could not drop the collection ({e}); deleting {DB_DIR}")
+        shutil.rmtree(DB_DIR, ignore_errors=True)
+        os.makedirs(DB_DIR, exist_ok=True)
+        save_manifest(manifest)
+
+def _ingest_docs(progress=None, scheme=None, document_type=None, full=False, force=False):
     # Load sources from CSV
     sources = load_sources_from_csv()
     
@@ -128,149 +413,114 @@ def ingest_docs():
         print("No sources found to ingest.")
         return
     
+    settings = ingest_settings()
+    manifest = load_manifest()
+    if not full and (manifest is None or manifest.get("settings") != settings or not os.path.exists(INDEX_VERSION_FILE)):
+        print("ℹ️ No manifest for the current chunking/embedding settings; rebuilding every source.")
+        full = True
+    if full:
+        # Chunks from earlier runs can't be matched to sources: start from scratch
+        manifest = {"settings": settings, "sources": {}}
+        _clear_vector_db(manifest)
+        scheme = document_type = None
+    entries = manifest["sources"]
+    
+    selected = [
+        s for s in sources
+        if (scheme is None or s['scheme'] == scheme) and (document_type is None or s['document_type'] == document_type)
+    ]
+    csv_urls = {s['url'] for s in sources}
+    removed = [url for url in entries if url not in csv_urls]
+    
+    scope = ", ".join(f"{k}={v}" for k, v in (("scheme", scheme), ("document_type", document_type)) if v) or "all sources"
     print(f"\n{'='*60}")
-    print(f"Starting document ingestion from {len(sources)} sources")
+    print(f"Starting {'full' if full else 'incremental'} ingestion of {len(selected)} sources ({scope})")
     print(f"{'='*60}\n")
+    _report(progress, "sources", source=0, sources=len(selected))
     
-    # Process each source
-    from playwright.sync_api import sync_playwright
-    import subprocess
+    to_delete = set()
+    for url in removed:
+        print(f"  🗑 Removed from sources.csv: {entries[url]['metadata']['description']}")
+        to_delete.update(entries.pop(url)["chunk_ids"])
     
-    def ensure_playwright_browsers():
-        """Ensure Playwright browsers are installed."""
-        print("🔍 Checking Playwright browser installation...")
-        try:
-            # Simple check by trying to launch in a dummy context if possible, 
-            # but usually it's better to just try and run the install command
-            # if we get the specific error.
-            pass 
-        except Exception:
-            pass
-
-    with sync_playwright() as p:
-        # 1.5. Ensure browser is available
-        try:
-            browser = p.chromium.launch(headless=True)
-        except Exception as e:
-            if "playwright install" in str(e).lower() or "executable doesn't exist" in str(e).lower():
-                print("⚠️ Playwright browser missing. Attempting to install chromium...")
-                try:
-                    subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
-                    browser = p.chromium.launch(headless=True)
-                except Exception as install_err:
-                    print(f"❌ Failed to auto-install Playwright browser: {install_err}")
-                    print("Please run 'playwright install chromium' manually on your server.")
-                    return
-            else:
-                print(f"❌ Failed to launch browser: {e}")
-                return
-
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, source in enumerate(sources, 1):
-            url = source.get('url', '')
-            doc_type = source.get('document_type', 'General')
-            scheme = source.get('scheme', 'general')
-            description = source.get('description', 'Unknown Source')
-            
-            print(f"[{idx}/{len(sources)}] Processing: {description}")
-            print(f"  URL: {url}")
-            print(f"  Scheme: {scheme} | Type: {doc_type}")
-            
-            try:
-                # Check if URL is a PDF or web page
-                if url.endswith('.pdf') or 'pdf' in url.lower():
-                    # Download PDF
-                    filepath = download_pdf(url, DOWNLOAD_DIR)
-                    if filepath:
-                        # Load PDF
-                        loader = PyPDFLoader(filepath)
-                        docs = loader.load()
-                        for doc in docs:
-                            doc.page_content = clean_text(doc.page_content)
-                            doc.metadata.update({
-                                "scheme": scheme,
-                                "document_type": doc_type,
-                                "source": url,
-                                "description": description,
-                                "is_live": False
-                            })
-                        all_documents.extend(docs)
-                        print(f"  ✓ Loaded {len(docs)} pages from PDF\n")
-                
-                else:
-                    # Process Dynamic Web Page (Live)
-                    print(f"  ⬇ Loading dynamic web page content...")
-                    try:
-                        page.goto(url, wait_until="networkidle", timeout=60000)
-                        time.sleep(7) 
-                        
-                        raw_content = page.evaluate("document.body.innerText")
-                        clean_content = clean_text(raw_content)
-                        
-                        print(f"  ✓ Captured dynamic content from {url} ({len(clean_content)} chars)")
-                        if len(clean_content) > 0:
-                            print(f"    Sample: {clean_content[:150]}...")
-                        
-                        # Verification
-                        if "₹" in clean_content or "NAV" in clean_content:
-                            print(f"    ➡️ Found potential NAV data!")
-                            nav_idx = clean_content.find("NAV")
-                            if nav_idx != -1:
-                                print(f"    NAV Snippet: ...{clean_content[max(0, nav_idx-50):nav_idx+100]}...")
-                        else:
-                            print(f"    ⚠️ Warning: No 'NAV' or '₹' found in captured content.")
-                        
-                        doc = Document(page_content=clean_content, metadata={
-                            "source": url,
-                            "scheme": scheme,
-                            "document_type": doc_type,
-                            "description": description,
-                            "is_live": True
-                        })
-                        all_documents.extend([doc])
-                        print("")
-                    except Exception as e:
-                        print(f"  ✗ Failed to scrape {url}: {e}\n")
-            except Exception as e:
-                print(f"  ✗ Failed to process: {e}\n")
-                continue
-        
-        browser.close()
+    # Streaming pipeline: fetch → parse/split (this thread) → embed → upsert, with
+    # bounded queues in between, so memory follows the batch size rather than the corpus
+    from langchain_chroma import Chroma
+    vectorstore = Chroma(persist_directory=DB_DIR)
+    model = {}  # the embed stage loads the embeddings on its first batch
+    pipeline = Pipeline()
+    pipeline.stage("fetch", "sources")
+    split_stats = pipeline.stage("split", "chunks")
+    pipeline.stage("embed", "chunks")
+    pipeline.stage("upsert", "chunks")
+    fetched, batches, embedded = pipeline.queue(), pipeline.queue(), pipeline.queue()
+    pool = create_parse_pool(min(PDF_PARSE_WORKERS, sum(is_pdf_url(s['url']) for s in selected)))
+    try:
+        with pipeline:
+            pipeline.spawn("fetch", _fetch_stage, pipeline, fetched, selected, entries, force, progress, pool)
+            pipeline.spawn("embed", _embed_stage, pipeline, batches, embedded, model)
+            pipeline.spawn("upsert", _upsert_stage, pipeline, embedded, vectorstore, progress)
+            split_stats.begin()
+            changed, added = _split_stage(pipeline, fetched, batches, entries, force, to_delete, progress)
+            split_stats.end()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
     
-    if not all_documents:
+    if full and not changed:
         print("No documents were successfully loaded.")
+        _log_summary(pipeline, progress)
         return
+    if not changed and not removed:
+        print("✓ Vector database is up to date; nothing to ingest.")
+        _log_summary(pipeline, progress)
+        with open(INDEX_VERSION_FILE) as f:
+            return f.read().strip()
     
+    if to_delete:
+        vectorstore.delete(ids=sorted(to_delete))
     print(f"\n{'='*60}")
-    print(f"Successfully loaded {len(all_documents)} document pages")
+    print(f"{changed} new or changed sources, {len(removed)} removed: {added} chunks embedded, {len(to_delete)} deleted")
     print(f"{'='*60}\n")
     
-    # Chunking
-    print("Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE, 
-        chunk_overlap=CHUNK_OVERLAP
-    )
-    splits = text_splitter.split_documents(all_documents)
-    print(f"✓ Created {len(splits)} chunks\n")
+    _report(progress, "indexing")
+    # Lexical (BM25) index over every stored chunk, in sources.csv order
+    print("Building BM25 lexical index...")
+    ingested = [s['url'] for s in sources if s['url'] in entries]
+    lexical_index = BM25Index.build(_stored_chunks(vectorstore, entries, ingested))
+    lexical_index.save(LEXICAL_INDEX_FILE)
+    print(f"✓ Lexical index ({len(lexical_index)} chunks) saved to {LEXICAL_INDEX_FILE}")
     
-    # Vector DB (Using Free Local HuggingFace Embeddings)
-    print("Creating vector embeddings and storing in ChromaDB...")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectorstore = Chroma.from_documents(
-        documents=splits, 
-        embedding=embeddings, 
-        persist_directory=DB_DIR
-    )
-    # ChromaDB auto-persists in newer versions
+    # Structured per-scheme facts (NAV, AUM, exit load, lock-in, ...) for LLM-free answers
+    facts = FundFactsStore(merge_fund_facts(entries[url]["facts"] for url in ingested), time.time())
+    facts.save(FUND_FACTS_FILE)
+    n_facts = sum(len(f) for f in facts.facts.values())
+    print(f"✓ Extracted {n_facts} fund facts to {FUND_FACTS_FILE}")
+    
+    # Query-router centroids from the labelled examples, same model as the index
+    embeddings = model.get("embeddings")
+    if embeddings is None and not os.path.exists(ROUTER_CENTROIDS_FILE):
+        embeddings = create_embeddings()
+    if embeddings is not None:
+        LocalRouter.build(embeddings, EMBEDDING_MODEL_NAME).save(ROUTER_CENTROIDS_FILE)
+        print(f"✓ Router centroids saved to {ROUTER_CENTROIDS_FILE}")
+    
+    manifest["updated_at"] = time.time()
+    save_manifest(manifest)
+    version = write_index_version()
+    _log_summary(pipeline, progress)
     
     print(f"\n{'='*60}")
-    print(f"✓ Successfully ingested documents into {DB_DIR}")
+    print(f"✓ Successfully ingested documents into {DB_DIR} (index version {version})")
     print(f"{'='*60}\n")
+    return version
 
 if __name__ == "__main__":
-    ingest_docs()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or update the vector database from sources.csv.")
+    parser.add_argument("--scheme", help="Only fetch sources of this scheme (e.g. hdfc_elss)")
+    parser.add_argument("--document-type", help="Only fetch sources of this document type (e.g. Notice)")
+    parser.add_argument("--force", action="store_true", help="Re-embed the selected sources even if unchanged")
+    parser.add_argument("--full", action="store_true", help="Clear vector_db/ and rebuild every source")
+    args = parser.parse_args()
+    ingest_docs(scheme=args.scheme, document_type=args.document_type, full=args.full, force=args.force)
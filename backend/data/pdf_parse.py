@@ -0,0 +1,65 @@
+"""PDF parsing and text cleaning for ingestion, run in worker processes.
+
+Kept free of the embedding model and vector store imports so that spawned
+workers start quickly.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes for parsing; 0 = one per CPU core, 1 = parse in-process
+PDF_PARSE_WORKERS = int(os.getenv("RAG_INGEST_PDF_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def clean_text(text):
+    """
+    Clean extracted text while preserving semantic structure.
+    Removes excessive noise but keeps numbers and labels intact.
+    """
+    import re
+
+    # 1. Basic normalization
+    text = text.replace('\xa0', ' ') # Remove non-breaking spaces
+
+    # 2. Remove purely decorative characters but keep currency symbols
+    text = re.sub(r'[^\x00-\x7F₹]+', ' ', text)
+
+    # 3. Collapse multiple spaces
+    text = re.sub(r' {2,}', ' ', text)
+
+    # 4. Handle lines and segments
+    lines = [line.strip() for line in text.split('\n')]
+    clean_lines = []
+    for line in lines:
+        if not line:
+            continue
+        # Skip lines that look like pure UI noise (very short navigation items etc)
+        # RELAXED: NAV/AUM labels are short, so let's be less aggressive
+        if len(line) < 2:
+            continue
+        clean_lines.append(line)
+
+    return '\n'.join(clean_lines)
+
+
+def parse_pdf(filepath, url, metadata):
+    """Cleaned pages of a downloaded PDF, in page order, tagged with the source metadata."""
+    from langchain_community.document_loaders import PyPDFLoader
+
+    docs = PyPDFLoader(filepath).load()
+    for doc in docs:
+        doc.page_content = clean_text(doc.page_content)
+        doc.metadata.update(metadata)
+        doc.metadata.update({"source": url, "is_live": False})
+    return docs
+
+
+def create_parse_pool(workers=PDF_PARSE_WORKERS):
+    """Process pool for `parse_pdf`, or None to parse in the calling process.
+
+    Workers are spawned rather than forked: ingestion runs next to Playwright
+    and, in the API, on a background thread, neither of which survive a fork.
+    """
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
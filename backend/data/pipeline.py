@@ -0,0 +1,191 @@
+"""Bounded hand-off between the threads of the streaming ingest pipeline.
+
+Stages run on their own threads and pass work through queues of at most
+PIPELINE_QUEUE_SIZE items, so a fast stage blocks instead of buffering the
+whole corpus ahead of a slow one. If any stage fails, every other stage's
+next hand-off raises `PipelineAborted` and the first error is re-raised
+when the pipeline is joined.
+
+Each stage records how long it spent waiting for input (starved) and
+waiting for room downstream (blocked); `summary()` turns that into a
+per-stage throughput table. A stage that is rarely starved but often
+blocked is ahead of the bottleneck.
+"""
+import os
+import sys
+import threading
+import time
+from queue import Empty, Full, Queue
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("RAG_INGEST_QUEUE_SIZE", "4"))  # items waiting between two stages
+_POLL_INTERVAL = 0.1
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """Another stage failed; this one should stop."""
+
+
+class StageStats:
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.units = 0
+        self.started = None
+        self.finished = None
+        self.starved = 0.0  # seconds waiting for input
+        self.blocked = 0.0  # seconds waiting for room downstream (summed over the stage's threads)
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 1, units: int = 0) -> None:
+        with self._lock:
+            self.items += items
+            self.units += units
+
+    def begin(self) -> None:
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def end(self) -> None:
+        self.finished = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        busy = wall - self.starved
+        return {
+            "items": self.items,
+            "units": self.units,
+            "unit": self.unit,
+            "wall_s": round(wall, 2),
+            "starved_s": round(self.starved, 2),
+            "blocked_s": round(self.blocked, 2),
+            "per_s": round(self.units / busy, 1) if busy > 0 else None,  # while it had input
+        }
+
+
+class Pipeline:
+    """Threads joined by bounded queues; use as a context manager around the run."""
+
+    def __init__(self, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.queue_size = max(1, queue_size)
+        self.stages: Dict[str, StageStats] = {}
+        self._threads: List[threading.Thread] = []
+        self._errors: List[BaseException] = []
+        self._aborted = threading.Event()
+
+    def stage(self, name: str, unit: str) -> StageStats:
+        self.stages[name] = StageStats(name, unit)
+        return self.stages[name]
+
+    def queue(self) -> Queue:
+        return Queue(maxsize=self.queue_size)
+
+    def abort(self, error: BaseException) -> None:
+        if not isinstance(error, PipelineAborted):
+            self._errors.append(error)
+        self._aborted.set()
+
+    def put(self, q: Queue, item, stage: Optional[StageStats] = None) -> None:
+        started = time.perf_counter()
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                break
+            except Full:
+                continue
+        if stage is not None:
+            with stage._lock:
+                stage.blocked += time.perf_counter() - started
+
+    def close(self, q: Queue) -> None:
+        self.put(q, _DONE)
+
+    def consume(self, q: Queue, stage: Optional[StageStats] = None) -> Iterator:
+        """Yield items from `q` until the producer closes it."""
+        while True:
+            started = time.perf_counter()
+            while True:
+                if self._aborted.is_set():
+                    raise PipelineAborted()
+                try:
+                    item = q.get(timeout=_POLL_INTERVAL)
+                    break
+                except Empty:
+                    continue
+            if stage is not None:
+                stage.starved += time.perf_counter() - started
+            if item is _DONE:
+                return
+            yield item
+
+    def spawn(self, name: str, fn: Callable, *args) -> None:
+        """Run `fn(*args)` on a `rag-ingest-<name>` thread, timed as stage `name` if there is one.
+
+        An exception aborts the pipeline.
+        """
+        def run():
+            stats = self.stages.get(name)
+            if stats is not None:
+                stats.begin()
+            try:
+                fn(*args)
+            except BaseException as e:
+                self.abort(e)
+            finally:
+                if stats is not None:
+                    stats.end()
+
+        thread = threading.Thread(target=run, name=f"rag-ingest-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None:
+            self.abort(exc)
+        for thread in self._threads:
+            thread.join()
+        # A stage stopped by PipelineAborted reports the error that caused it
+        if self._errors and (exc is None or isinstance(exc, PipelineAborted)):
+            raise self._errors[0]
+        return False
+
+    def summary(self) -> dict:
+        return {
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            **peak_rss_mb(),
+        }
+
+
+def peak_rss_mb() -> dict:
+    """Peak resident memory of this process and of its largest finished child, in MB."""
+    if resource is None:
+        return {}
+    scale = 1e6 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return {
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "peak_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def format_summary(summary: dict) -> str:
+    lines = [f"{'stage':<8} {'items':>6} {'units':>14} {'wall s':>7} {'units/s':>8} {'starved s':>10} {'blocked s':>10}"]
+    for name, s in summary["stages"].items():
+        units = f"{s['units']} {s['unit']}"
+        rate = f"{s['per_s']:.1f}" if s["per_s"] is not None else "-"
+        lines.append(f"{name:<8} {s['items']:>6} {units:>14} {s['wall_s']:>7.2f} {rate:>8} "
+                     f"{s['starved_s']:>10.2f} {s['blocked_s']:>10.2f}")
+    if "peak_rss_mb" in summary:
+        lines.append(f"Peak RSS: {summary['peak_rss_mb']:.0f} MB (largest child process {summary['peak_child_rss_mb']:.0f} MB)")
+    return "\n".join(lines)
@@ -0,0 +1,170 @@
+"""Concurrent rendering of live web sources with headless Chromium.
+
+A small pool of pages in one browser context works through the sources,
+each waiting on its own readiness condition instead of a fixed sleep:
+
+    text:<string>       the rendered body text contains <string> (e.g. text:NAV)
+    selector:<css>      an element matching <css> is attached
+    idle                no network activity for 500 ms
+    load                the window `load` event has fired
+
+Conditions and timeouts come from the optional `wait_for` / `timeout_s`
+columns of sources.csv, falling back to DEFAULT_WAIT_FOR by document type.
+A condition that isn't met in time is not fatal: the page is captured as
+rendered and the result is flagged `ready=False`.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+SCRAPE_CONCURRENCY = int(os.getenv("RAG_SCRAPE_CONCURRENCY", "4"))
+SCRAPE_TIMEOUT = float(os.getenv("RAG_SCRAPE_TIMEOUT", "30"))  # seconds per source, navigation included
+# Skip images, fonts and media; they don't change the page text
+SCRAPE_BLOCK_RESOURCES = os.getenv("RAG_SCRAPE_BLOCK_RESOURCES", "1") == "1"
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
+DEFAULT_WAIT_FOR = {"Web": "text:NAV"}  # fund pages render NAV client-side
+FALLBACK_WAIT_FOR = "idle"
+
+_TEXT_READY_JS = "text => document.body !== null && document.body.innerText.includes(text)"
+
+
+class ScrapeResult:
+    def __init__(self, url: str, text: Optional[str], ready: bool, condition: str, elapsed: float,
+                 error: Optional[str] = None):
+        self.url = url
+        self.text = text          # document.body.innerText, None if navigation failed
+        self.ready = ready        # readiness condition met before the timeout
+        self.condition = condition
+        self.elapsed = elapsed    # seconds
+        self.error = error
+
+
+def parse_condition(condition: str):
+    """Split a readiness condition into (kind, argument); raises ValueError if unknown."""
+    kind, _, arg = condition.partition(":")
+    if kind in ("text", "selector") and arg:
+        return kind, arg
+    if kind in ("idle", "load") and not arg:
+        return kind, None
+    raise ValueError(f"Unknown readiness condition: {condition!r}")
+
+
+def source_condition(source: dict) -> str:
+    return source.get("wait_for") or DEFAULT_WAIT_FOR.get(source.get("document_type"), FALLBACK_WAIT_FOR)
+
+
+def source_timeout(source: dict, default: float = SCRAPE_TIMEOUT) -> float:
+    return float(source.get("timeout_s") or default)
+
+
+async def wait_until_ready(page, condition: str, timeout_ms: float) -> None:
+    kind, arg = parse_condition(condition)
+    if kind == "text":
+        await page.wait_for_function(_TEXT_READY_JS, arg=arg, timeout=timeout_ms)
+    elif kind == "selector":
+        await page.wait_for_selector(arg, state="attached", timeout=timeout_ms)
+    elif kind == "idle":
+        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+    else:
+        await page.wait_for_load_state("load", timeout=timeout_ms)
+
+
+async def _scrape_one(page, source: dict, default_timeout: float) -> ScrapeResult:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    url = source["url"]
+    condition = source_condition(source)
+    timeout_ms = source_timeout(source, default_timeout) * 1000
+    started = time.perf_counter()
+
+    def elapsed():
+        return time.perf_counter() - started
+
+    try:
+        await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+    except Exception as e:
+        return ScrapeResult(url, None, False, condition, elapsed(), error=str(e))
+
+    ready = True
+    try:
+        await wait_until_ready(page, condition, max(timeout_ms - elapsed() * 1000, 1.0))
+    except PlaywrightTimeoutError:
+        ready = False
+    try:
+        text = await page.evaluate("document.body ? document.body.innerText : ''")
+    except Exception as e:
+        return ScrapeResult(url, None, False, condition, elapsed(), error=str(e))
+    return ScrapeResult(url, text, ready, condition, elapsed())
+
+
+async def _launch(playwright):
+    try:
+        return await playwright.chromium.launch(headless=True)
+    except Exception as e:
+        if "playwright install" not in str(e).lower() and "executable doesn't exist" not in str(e).lower():
+            raise
+    print("⚠️ Playwright browser missing. Attempting to install chromium...")
+    subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
+    return await playwright.chromium.launch(headless=True)
+
+
+async def scrape_pages_async(sources: List[dict], concurrency: int = SCRAPE_CONCURRENCY,
+                             timeout: float = SCRAPE_TIMEOUT, block_resources: bool = SCRAPE_BLOCK_RESOURCES,
+                             on_result: Optional[Callable[[dict, ScrapeResult], None]] = None) -> List[ScrapeResult]:
+    """Scrape `sources` on up to `concurrency` pages; results in source order.
+
+    `on_result(source, result)` is called as each page finishes, on a worker
+    thread so a callback that blocks (e.g. on a full ingest queue) holds up
+    only its own page, not the event loop the other pages' waits run on.
+    Raises only if the browser can't be launched; per-source failures are
+    in `error`.
+    """
+    from playwright.async_api import async_playwright
+
+    for source in sources:
+        parse_condition(source_condition(source))
+    results: Dict[str, ScrapeResult] = {}
+    queue = asyncio.Queue()
+    for source in sources:
+        queue.put_nowait(source)
+
+    async with async_playwright() as playwright:
+        browser = await _launch(playwright)
+        try:
+            context = await browser.new_context(user_agent=USER_AGENT)
+            if block_resources:
+                async def block(route):
+                    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+                        await route.abort()
+                    else:
+                        await route.continue_()
+                await context.route("**/*", block)
+
+            async def worker():
+                page = await context.new_page()
+                try:
+                    while not queue.empty():
+                        source = queue.get_nowait()
+                        result = await _scrape_one(page, source, timeout)
+                        results[source["url"]] = result
+                        if on_result is not None:
+                            await asyncio.to_thread(on_result, source, result)
+                finally:
+                    await page.close()
+
+            await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(sources))))))
+        finally:
+            await browser.close()
+    return [results[source["url"]] for source in sources]
+
+
+def scrape_pages(sources: List[dict], **kwargs) -> List[ScrapeResult]:
+    """Blocking wrapper around `scrape_pages_async` for the (thread-based) ingest pipeline."""
+    if not sources:
+        return []
+    return asyncio.run(scrape_pages_async(sources, **kwargs))
@@ -0,0 +1,127 @@
+from typing import List, Optional, Tuple
+
+# Rough chars-per-token ratio for Llama-style tokenizers on English text
+CHARS_PER_TOKEN = 4
+# Shortest suffix/prefix match treated as chunk overlap when offsets are unknown
+MIN_OVERLAP_CHARS = 30
+# Don't bother truncating a segment into less room than this
+MIN_TRUNCATED_TOKENS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def is_numeric_chunk(text: str) -> bool:
+    return "₹" in text and any(c.isdigit() for c in text)
+
+
+def _suffix_prefix_overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    upper = min(len(left), len(right), max_overlap)
+    for size in range(upper, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class _Segment:
+    """Stitched text from one or more adjacent chunks of the same source page."""
+
+    def __init__(self, doc, rank: int):
+        self.text = doc.page_content
+        self.docs = [doc]
+        self.rank = rank
+        self.start = doc.metadata.get("start_index")
+        self.end = self.start + len(self.text) if self.start is not None else None
+        self.is_live = bool(doc.metadata.get("is_live", False))
+
+    def absorb(self, other: "_Segment", overlap_chars: int) -> None:
+        self.text += other.text[overlap_chars:]
+        self.docs.extend(other.docs)
+        self.rank = min(self.rank, other.rank)
+        self.is_live = self.is_live or other.is_live
+        if other.end is not None:
+            self.end = max(self.end or 0, other.end)
+
+    @property
+    def priority(self):
+        # Live data first, then numeric chunks, then by best retrieval rank
+        return (not self.is_live, not is_numeric_chunk(self.text), self.rank)
+
+
+def _stitch(segments: List[_Segment], max_overlap: int) -> List[_Segment]:
+    """Merge overlapping neighbours of one source page into contiguous segments."""
+    if all(seg.start is not None for seg in segments):
+        segments.sort(key=lambda seg: seg.start)
+        merged = [segments[0]]
+        for seg in segments[1:]:
+            cur = merged[-1]
+            if seg.start <= cur.end:
+                if seg.end > cur.end:
+                    cur.absorb(seg, cur.end - seg.start)
+                else:
+                    cur.docs.extend(seg.docs)
+                    cur.rank = min(cur.rank, seg.rank)
+            else:
+                merged.append(seg)
+        return merged
+
+    # No offsets (older indexes): chain chunks by matching text overlap
+    merged = list(segments)
+    changed = True
+    while changed:
+        changed = False
+        for i, left in enumerate(merged):
+            for j, right in enumerate(merged):
+                if i == j:
+                    continue
+                overlap = _suffix_prefix_overlap(left.text, right.text, max_overlap)
+                if overlap:
+                    left.absorb(right, overlap)
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+
+def pack_context(docs, token_budget: int = 3000, max_overlap: int = 400) -> Tuple[str, list]:
+    """Stitch, de-duplicate and budget retrieved chunks into a prompt context.
+
+    `docs` are in retrieval (score) order. Overlapping chunks from the same
+    source page are merged, segments repeated elsewhere are dropped, and
+    segments are added by priority until `token_budget` is reached. Returns
+    the context string and the documents that made it into the context.
+    """
+    groups = {}
+    for rank, doc in enumerate(docs):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append(_Segment(doc, rank))
+
+    segments: List[_Segment] = []
+    for group in groups.values():
+        segments.extend(_stitch(group, max_overlap))
+    segments.sort(key=lambda seg: seg.priority)
+
+    packed: List[str] = []
+    used_docs = []
+    remaining = token_budget
+    for seg in segments:
+        text = seg.text.strip()
+        if not text or any(text in kept for kept in packed):
+            continue
+        cost = estimate_tokens(text)
+        if cost > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS:
+                continue
+            text = text[: remaining * CHARS_PER_TOKEN]
+            cost = remaining
+        packed.append(text)
+        used_docs.extend(seg.docs)
+        remaining -= cost
+        if remaining <= 0:
+            break
+
+    return "\n\n".join(packed), used_docs
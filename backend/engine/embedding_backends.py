@@ -0,0 +1,177 @@
+"""Embedding model backends: sentence-transformers on PyTorch, or an int8 ONNX export.
+
+Both produce the same model's normalised mean-pooled vectors, so an index
+built with one can be queried with the other once `compare_embeddings`
+shows they agree within tolerance (see tests/verify_embeddings.py).
+
+    python -m backend.engine.embedding_backends export   # writes RAG_ONNX_MODEL_DIR
+
+Exporting needs torch, transformers and onnx; serving the ONNX backend needs
+only onnxruntime, tokenizers and numpy.
+"""
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# sentence-transformers truncates this model's inputs at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+EMBEDDING_BATCH_SIZE = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_THREADS = int(os.getenv("RAG_EMBEDDING_THREADS", "0"))  # 0 = runtime default (all cores)
+ONNX_MODEL_DIR = os.getenv(
+    "RAG_ONNX_MODEL_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/onnx/all-MiniLM-L6-v2-int8")),
+)
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_META_FILE = "export.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain embeddings over an exported ONNX encoder (mean pooling + L2 norm)."""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, threads: int = EMBEDDING_THREADS,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"No ONNX model at {model_path}. Export one with: python -m backend.engine.embedding_backends export"
+            )
+        with open(os.path.join(model_dir, ONNX_META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.meta.get("max_seq_length", MAX_SEQ_LENGTH))
+        self.tokenizer.enable_padding()
+        self.batch_size = max(1, batch_size)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batch texts of similar length together to keep padding small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self._encode([texts[i] for i in batch])
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+            vectors[batch] = encoded
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def create_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """Embeddings for EMBEDDING_MODEL_NAME on the configured backend (RAG_EMBEDDING_BACKEND)."""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx":
+        return OnnxEmbeddings()
+    if backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'torch' or 'onnx')")
+    from langchain_huggingface import HuggingFaceEmbeddings
+    if EMBEDDING_THREADS:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME, encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE})
+
+
+def compare_embeddings(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> dict:
+    """Cosine similarity between two backends' vectors for the same texts."""
+    a = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "worst_text": texts[int(cosine.argmin())],
+    }
+
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, model_name: str = EMBEDDING_MODEL_NAME, quantize: bool = True) -> str:
+    """Export the encoder to ONNX, dynamically quantising weights to int8; returns the model path."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    encoder = Encoder(AutoModel.from_pretrained(model_name)).eval()
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    fp32_path = os.path.join(output_dir, "model_fp32.onnx")
+
+    sample = tokenizer(["an example sentence to trace"], return_tensors="pt")
+    inputs = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in inputs + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder, tuple(sample[name] for name in inputs), fp32_path,
+            input_names=inputs, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes, opset_version=17,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    else:
+        os.replace(fp32_path, model_path)
+
+    tokenizer.save_pretrained(output_dir)  # tokenizer.json for the `tokenizers` runtime
+    with open(os.path.join(output_dir, ONNX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": MAX_SEQ_LENGTH,
+            "quantized": quantize,
+            "exported_at": time.time(),
+        }, f, indent=2)
+    return model_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to (int8) ONNX.")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="Keep fp32 weights")
+    args = parser.parse_args()
+    path = export_onnx(args.output, quantize=not args.no_quantize)
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"✓ Exported {EMBEDDING_MODEL_NAME} to {path} ({size_mb:.1f} MB); verify with tests/verify_embeddings.py")
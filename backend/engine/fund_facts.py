@@ -0,0 +1,234 @@
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+from typing import Dict, Optional
+from urllib.parse import unquote
+
+FUND_NAMES = {
+    "hdfc_large_cap": "HDFC Large Cap Fund",
+    "hdfc_flexi_cap": "HDFC Flexi Cap Fund",
+    "hdfc_elss": "HDFC ELSS Tax Saver",
+}
+
+# Lower number wins when several documents state the same fact
+SOURCE_PRECEDENCE = {"Web": 0, "Notice": 1, "KIM": 2, "SID": 3, "Factsheet": 4}
+
+_AMOUNT = r"(?:₹|Rs\.?|INR)\s?([\d,]+(?:\.\d+)?)"
+
+# fact -> extraction patterns; group 1 is the value
+FACT_PATTERNS = {
+    "nav": [re.compile(r"\bNAV\b[^₹\n]{0,40}" + _AMOUNT, re.I)],
+    "aum": [re.compile(r"\b(?:AUM|Assets Under Management|Fund Size)\b[^₹\n]{0,40}" + _AMOUNT + r"\s?(?:Cr|Crore)", re.I)],
+    "lock_in": [
+        re.compile(r"\block[- ]in\s+period\s+of\s+(\d+\s+years?)", re.I),
+        re.compile(r"\b(\d+\s+years?)\s+(?:statutory\s+)?lock[- ]in", re.I),
+    ],
+    "min_sip": [re.compile(r"\b(?:Minimum|Min\.?)\s+(?:SIP|Systematic Investment Plan)\b[^₹\n]{0,60}" + _AMOUNT, re.I)],
+}
+
+# Only current on live pages: "NAV of ₹10" in an SID/KIM is the NFO face value
+LIVE_ONLY_FACTS = {"nav", "aum"}
+
+# Exit loads are multi-sentence rules ("1% if redeemed within 1 year. Nil
+# thereafter."): take every following sentence that still describes the load
+_EXIT_LOAD_START = re.compile(r"\bExit\s+Load\b\s*[:\-]?\s*", re.I)
+_EXIT_LOAD_TERMS = re.compile(
+    r"%|\bnil\b|\bno exit load\b|redee?m|switch|allotment|thereafter|\b(?:years?|months?|days?)\b", re.I
+)
+_SENTENCE_END = re.compile(r"(?<=\.)\s+|\n")
+EXIT_LOAD_WINDOW = 600  # chars after the label; a rule still going at the end is left to the LLM
+
+# fact -> query phrases that ask for it. Expense ratio has no template: it
+# differs by plan and notices revise it ("from 0.75% to 0.70%" w.e.f. a
+# date), so asking for it still goes to the LLM rather than to another fact
+FACT_INTENTS = {
+    "nav": ["nav", "net asset value"],
+    "aum": ["aum", "assets under management", "fund size"],
+    "expense_ratio": ["expense ratio", "ter", "total expense"],
+    "exit_load": ["exit load"],
+    "lock_in": ["lock in", "lock-in", "lockin"],
+    "min_sip": ["min sip", "minimum sip", "minimum investment for sip"],
+}
+
+# Queries with these words need the LLM (advice refusals, comparisons, explanations)
+NON_FACT_WORDS = [
+    "should", "buy", "sell", "hold", "invest in", "better", "best", "compare", "vs",
+    "versus", "why", "explain", "history", "change", "changed", "difference",
+    # Revisions and plan variants: one stored value can't answer these
+    "before", "old", "previous", "revised", "new", "regular", "direct",
+]
+
+FACT_TEMPLATES = {
+    "nav": "The NAV of {fund} is ₹{value}{as_of}.",
+    "aum": "The AUM of {fund} is ₹{value} crore{as_of}.",
+    "exit_load": "Exit load for {fund}{as_of}: {value}",
+    "lock_in": "{fund} has a lock-in period of {value}{as_of}.",
+    "min_sip": "The minimum SIP amount for {fund} is ₹{value}{as_of}.",
+}
+
+_MONTH_DATE = re.compile(r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{1,2}),?\s+(\d{4})")
+_DASH_DATE = re.compile(r"(\d{2})-(\d{2})-(\d{4})")
+_WORD_RE = re.compile(r"[a-z0-9\-]+")
+
+
+def _document_date(text: str) -> Optional[str]:
+    """Best-effort ISO date from a document name or URL (e.g. 'dated May 30, 2025')."""
+    m = _MONTH_DATE.search(text)
+    if m:
+        return datetime.strptime(f"{m.group(1)} {m.group(2)} {m.group(3)}", "%B %d %Y").date().isoformat()
+    m = _DASH_DATE.search(text)
+    if m:
+        try:
+            return date(int(m.group(3)), int(m.group(2)), int(m.group(1))).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def _exit_load(text: str) -> Optional[str]:
+    """The whole exit-load rule after an 'Exit Load' label, or None if it can't be delimited."""
+    for m in _EXIT_LOAD_START.finditer(text):
+        window = text[m.end():m.end() + EXIT_LOAD_WINDOW]
+        sentences = [part.strip() for part in _SENTENCE_END.split(window) if part.strip()]
+        rule = []
+        for sentence in sentences:
+            if not _EXIT_LOAD_TERMS.search(sentence):
+                break
+            rule.append(sentence)
+        if not rule:
+            continue
+        if len(rule) == len(sentences) and len(text) > m.end() + EXIT_LOAD_WINDOW:
+            return None  # runs past the window: may be cut mid-rule
+        value = " ".join(" ".join(rule).split())
+        if len(value) >= 10:
+            return value
+    return None
+
+
+def _extract(fact: str, text: str) -> Optional[str]:
+    if fact == "exit_load":
+        return _exit_load(text)
+    for pattern in FACT_PATTERNS[fact]:
+        m = pattern.search(text)
+        if m:
+            return " ".join(m.group(1).split())
+    return None
+
+
+def extract_fund_facts(docs) -> dict:
+    """Extract per-scheme numeric facts from ingested pages.
+
+    Each fact records its value, source description, URL, document type and
+    as-of date. When several documents state the same fact, live pages win,
+    then notices, KIMs and SIDs. NAV and AUM are taken from live pages only.
+    """
+    today = date.today().isoformat()
+    facts: Dict[str, Dict[str, dict]] = {}
+    for doc in docs:
+        meta = doc.metadata
+        scheme = meta.get("scheme")
+        if scheme not in FUND_NAMES:
+            continue
+        doc_type = meta.get("document_type", "")
+        rank = SOURCE_PRECEDENCE.get(doc_type, len(SOURCE_PRECEDENCE))
+        for fact in FACT_TEMPLATES:
+            current = facts.get(scheme, {}).get(fact)
+            if current is not None and current["_rank"] <= rank:
+                continue
+            if fact in LIVE_ONLY_FACTS and not meta.get("is_live"):
+                continue
+            value = _extract(fact, doc.page_content)
+            if value is None:
+                continue
+            facts.setdefault(scheme, {})[fact] = {
+                "value": value,
+                "source": meta.get("description", "Unknown Source"),
+                "url": meta.get("source", ""),
+                "document_type": doc_type,
+                "as_of": today if meta.get("is_live") else _document_date(unquote(meta.get("source", ""))),
+                "_rank": rank,
+            }
+
+    for scheme_facts in facts.values():
+        for fact in scheme_facts.values():
+            fact.pop("_rank")
+    return facts
+
+
+def merge_fund_facts(facts_by_source) -> dict:
+    """Combine per-source `extract_fund_facts` results, given in source order.
+
+    Same precedence as extracting over all pages at once: the best-ranked
+    document type wins, and among equals the earliest source.
+    """
+    merged: Dict[str, Dict[str, dict]] = {}
+    for source_facts in facts_by_source:
+        for scheme, scheme_facts in source_facts.items():
+            for fact, record in scheme_facts.items():
+                if fact not in FACT_TEMPLATES:  # extracted by an older version
+                    continue
+                rank = SOURCE_PRECEDENCE.get(record.get("document_type", ""), len(SOURCE_PRECEDENCE))
+                current = merged.get(scheme, {}).get(fact)
+                if current is not None and SOURCE_PRECEDENCE.get(
+                    current.get("document_type", ""), len(SOURCE_PRECEDENCE)
+                ) <= rank:
+                    continue
+                merged.setdefault(scheme, {})[fact] = dict(record)
+    return merged
+
+
+class FundFactsStore:
+    """Per-scheme fact table with a templated, LLM-free answer path."""
+
+    def __init__(self, facts: Optional[dict] = None, built_at: Optional[float] = None):
+        self.facts = facts or {}
+        self.built_at = built_at
+
+    @classmethod
+    def from_docs(cls, docs) -> "FundFactsStore":
+        return cls(extract_fund_facts(docs), time.time())
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"built_at": self.built_at, "schemes": self.facts}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FundFactsStore":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("schemes", {}), data.get("built_at"))
+
+    @staticmethod
+    def match_intent(query: str) -> Optional[str]:
+        """Return the single fact a query asks for, or None if it needs the LLM."""
+        q = " ".join(_WORD_RE.findall(query.lower()))
+        padded = f" {q} "
+        if any(f" {w} " in padded for w in NON_FACT_WORDS):
+            return None
+        matched = [
+            fact for fact, phrases in FACT_INTENTS.items()
+            if any(f" {p} " in padded for p in phrases)
+        ]
+        return matched[0] if len(matched) == 1 else None
+
+    def answer(self, query: str, scheme: str) -> Optional[dict]:
+        """Templated answer with sources for a single-fact query, or None."""
+        fact = self.match_intent(query)
+        if fact not in FACT_TEMPLATES:
+            return None
+        record = self.facts.get(scheme, {}).get(fact)
+        if record is None:
+            return None
+
+        as_of = f" (as of {record['as_of']})" if record.get("as_of") else ""
+        sentence = FACT_TEMPLATES[fact].format(fund=FUND_NAMES[scheme], value=record["value"], as_of=as_of)
+        return {
+            "answer": f"{sentence}\nLast updated from sources: {record['source']}",
+            "sources": [record["source"]],
+            "fact": fact,
+        }
+
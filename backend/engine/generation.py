@@ -0,0 +1,434 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional
+
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "TimeoutException", "ConnectError", "ReadTimeout"}
+
+
+class GenerationError(Exception):
+    """Raised when neither the primary nor the fallback model produced an answer."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429/5xx responses, timeouts and connection errors are worth retrying."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def error_kind(exc: BaseException) -> str:
+    """Short label for metrics: the HTTP status, 'timeout', 'connection' or the class name."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return str(status)
+    name = type(exc).__name__
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in name:
+        return "timeout"
+    if "Connect" in name:
+        return "connection"
+    return name
+
+
+def token_usage(message) -> Optional[dict]:
+    """Prompt/completion token counts reported with a LangChain message, if any."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    return {"prompt_tokens": usage.get("input_tokens", 0), "completion_tokens": usage.get("output_tokens", 0)}
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, half-opens after `reset_timeout`.
+
+    Half-open lets a single trial call through; its result closes or re-opens
+    the breaker, and other callers are refused until then.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """End a trial call that produced no verdict (cancelled, rejected key) so another can run."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class GenerationResult:
+    def __init__(self, message, model: str, attempts: int, hedged: bool = False, fallback: bool = False, errors=None):
+        self.text = message.content
+        self.usage = token_usage(message)
+        self.model = model
+        self.attempts = attempts
+        self.hedged = hedged
+        self.fallback = fallback
+        self.errors = errors or []  # error_kind() of each failed attempt
+
+    @property
+    def outcome(self) -> str:
+        return "fallback" if self.fallback else "hedged" if self.hedged else "primary"
+
+
+class Generator:
+    """LLM call policy: deadline, jittered retries, hedging, circuit breaker, fallback.
+
+    Each request gets `deadline` seconds overall. The primary model is tried
+    with full-jitter exponential backoff on retryable errors; once a call has
+    run longer than the observed p95 latency, an identical hedged request is
+    sent and the first response wins. When the breaker for the primary model
+    is open, or too little time is left for another primary attempt, the
+    smaller fallback model answers instead with the remaining budget.
+    `llm_factory(api_key, model_name)` returns a LangChain chat model.
+    """
+
+    def __init__(
+        self,
+        llm_factory: Callable,
+        primary_model: str,
+        fallback_model: Optional[str] = None,
+        deadline: float = 30.0,
+        fallback_reserve: float = 5.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+    ):
+        self.llm_factory = llm_factory
+        self.primary_model = primary_model
+        self.fallback_model = fallback_model
+        self.deadline = deadline
+        self.fallback_reserve = fallback_reserve if fallback_model else 0.0
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.latency = LatencyTracker()
+        self._pool = None
+        self._fallback_pool = None
+        self._pool_lock = threading.Lock()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p = self.latency.quantile(self.hedge_quantile)
+        return None if p is None else max(p, self.hedge_min_delay)
+
+    def _primary_budget(self, deadline_at: float) -> float:
+        return deadline_at - time.monotonic() - self.fallback_reserve
+
+    def _record(self, ok: bool, started: float = None) -> None:
+        # Only retryable errors are recorded as failures: a 400/401/403 is about
+        # the request or the caller's key (users bring their own), not the model
+        if ok:
+            self.breaker.record_success()
+            if started is not None:
+                self.latency.record(time.monotonic() - started)
+        else:
+            self.breaker.record_failure()
+
+    async def _acall_hedged(self, llm, prompt: str, budget: float):
+        """One primary attempt; returns (message, hedged).
+
+        Raises once every call has failed (the last error) or the budget runs out.
+        """
+        started = time.monotonic()
+        first = asyncio.ensure_future(llm.ainvoke(prompt))
+        tasks = {first}
+        hedged = False
+        try:
+            delay = self._hedge_delay()
+            if delay is not None and delay < budget:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    tasks.add(asyncio.ensure_future(llm.ainvoke(prompt)))
+                    hedged = True
+            # A failed call doesn't end the attempt while the other may still answer
+            pending, error = set(tasks), None
+            while pending:
+                remaining = budget - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record(True, started)
+                        return task.result(), hedged
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def agenerate(self, prompt: str, api_key: Optional[str] = None, deadline: Optional[float] = None) -> GenerationResult:
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempts = 0
+        last_error = None
+        errors = []
+
+        if self.breaker.allow():
+            try:
+                llm = self.llm_factory(api_key, self.primary_model)
+                for attempt in range(self.max_retries + 1):
+                    budget = self._primary_budget(deadline_at)
+                    if budget <= 0:
+                        break
+                    attempts += 1
+                    try:
+                        message, hedged = await self._acall_hedged(llm, prompt, budget)
+                        return GenerationResult(message, self.primary_model, attempts, hedged=hedged, errors=errors)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        last_error = e
+                        errors.append(error_kind(e))
+                        if not is_retryable(e):
+                            break
+                        self._record(False)
+                        if not self.breaker.allow():
+                            break
+                        pause = self._backoff(attempt)
+                        if self._primary_budget(deadline_at) - pause <= 0:
+                            break
+                        await asyncio.sleep(pause)
+                if last_error is not None and not is_retryable(last_error):
+                    raise last_error
+            finally:
+                # A half-open trial ended without a verdict (bad key, cancelled)
+                self.breaker.release()
+
+        return await self._afallback(prompt, api_key, deadline_at, attempts, last_error, errors)
+
+    async def _afallback(self, prompt, api_key, deadline_at, attempts, last_error, errors) -> GenerationResult:
+        if not self.fallback_model:
+            raise GenerationError(f"Primary model failed: {last_error}") from last_error
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise GenerationError("Generation deadline exceeded") from last_error
+        llm = self.llm_factory(api_key, self.fallback_model)
+        try:
+            response = await asyncio.wait_for(llm.ainvoke(prompt), timeout=remaining)
+        except asyncio.TimeoutError as e:
+            raise GenerationError("Generation deadline exceeded") from e
+        return GenerationResult(response, self.fallback_model, attempts + 1, fallback=True, errors=errors)
+
+    async def astream(self, prompt: str, api_key: Optional[str] = None, info: Optional[dict] = None,
+                      deadline: Optional[float] = None):
+        """Stream tokens from the primary model, or the fallback when it is unavailable.
+
+        Falls back only if the primary fails before emitting its first token,
+        including when no token arrives within the deadline (less the fallback
+        reserve); the fallback's first token must arrive within what is left.
+        Once tokens flow the stream runs to completion. Hedging does not apply
+        to streams. If given, `info` is filled with the model used, whether it
+        was the fallback, and failed attempt kinds.
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        info = info if info is not None else {}
+        info.update(model=None, fallback=False, errors=[])
+        models = [self.primary_model] if self.breaker.allow() else []
+        if self.fallback_model:
+            models.append(self.fallback_model)
+        last_error = None
+        for model in models:
+            started = time.monotonic()
+            emitted = False
+            info.update(model=model, fallback=model != self.primary_model)
+            if model == self.primary_model:
+                budget = self._primary_budget(deadline_at)
+            else:
+                budget = deadline_at - started
+            stream = self.llm_factory(api_key, model).astream(prompt)
+            try:
+                if budget <= 0:
+                    continue
+                try:
+                    first = await asyncio.wait_for(stream.__anext__(), timeout=max(budget, 0))
+                except StopAsyncIteration:
+                    first = None
+                if first is not None:
+                    emitted = True
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                if model == self.primary_model:
+                    self._record(True, started)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                info["errors"].append(error_kind(e))
+                if model == self.primary_model and is_retryable(e):
+                    self._record(False)
+                if emitted or not is_retryable(e):
+                    raise
+            finally:
+                await stream.aclose()
+                if model == self.primary_model:
+                    self.breaker.release()
+        if isinstance(last_error, asyncio.TimeoutError):
+            raise GenerationError("Generation deadline exceeded") from last_error
+        raise GenerationError(f"No model available: {last_error}") from last_error
+
+    def _get_pool(self, fallback: bool = False) -> ThreadPoolExecutor:
+        # The fallback gets its own pool so it never queues behind primaries
+        # and hedges that were abandoned when Groq is slow
+        if (self._fallback_pool if fallback else self._pool) is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="rag-llm")
+                if self._fallback_pool is None:
+                    self._fallback_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="rag-llm-fallback")
+        return self._fallback_pool if fallback else self._pool
+
+    @staticmethod
+    def _invoke(llm, prompt: str, timeout: float):
+        # The request timeout matches the caller's budget, so an abandoned call
+        # frees its pool thread when the budget runs out instead of at the
+        # client's own (much longer) timeout
+        return llm.invoke(prompt, timeout=max(timeout, 0.1))
+
+    def _call_hedged(self, llm, prompt: str, budget: float):
+        started = time.monotonic()
+        pool = self._get_pool()
+        futures = {pool.submit(self._invoke, llm, prompt, budget)}
+        hedged = False
+        delay = self._hedge_delay()
+        if delay is not None and delay < budget:
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                futures.add(pool.submit(self._invoke, llm, prompt, budget - (time.monotonic() - started)))
+                hedged = True
+        pending, error = set(futures), None
+        while pending:
+            remaining = budget - (time.monotonic() - started)
+            if remaining <= 0:
+                # Threads can't be cancelled; they finish on their own request timeout
+                raise TimeoutError()
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._record(True, started)
+                    return future.result(), hedged
+                error = future.exception()
+        raise error
+
+    def generate(self, prompt: str, api_key: Optional[str] = None, deadline: Optional[float] = None) -> GenerationResult:
+        """Blocking equivalent of `agenerate` for sync callers (e.g. Streamlit)."""
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempts = 0
+        last_error = None
+        errors = []
+
+        if self.breaker.allow():
+            try:
+                llm = self.llm_factory(api_key, self.primary_model)
+                for attempt in range(self.max_retries + 1):
+                    budget = self._primary_budget(deadline_at)
+                    if budget <= 0:
+                        break
+                    attempts += 1
+                    try:
+                        message, hedged = self._call_hedged(llm, prompt, budget)
+                        return GenerationResult(message, self.primary_model, attempts, hedged=hedged, errors=errors)
+                    except Exception as e:
+                        last_error = e
+                        errors.append(error_kind(e))
+                        if not is_retryable(e):
+                            break
+                        self._record(False)
+                        if not self.breaker.allow():
+                            break
+                        pause = self._backoff(attempt)
+                        if self._primary_budget(deadline_at) - pause <= 0:
+                            break
+                        time.sleep(pause)
+                if last_error is not None and not is_retryable(last_error):
+                    raise last_error
+            finally:
+                # A half-open trial ended without a verdict (bad key, cancelled)
+                self.breaker.release()
+
+        if not self.fallback_model:
+            raise GenerationError(f"Primary model failed: {last_error}") from last_error
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise GenerationError("Generation deadline exceeded") from last_error
+        future = self._get_pool(fallback=True).submit(
+            self._invoke, self.llm_factory(api_key, self.fallback_model), prompt, remaining
+        )
+        done, _ = wait({future}, timeout=remaining)
+        if not done:
+            raise GenerationError("Generation deadline exceeded") from last_error
+        return GenerationResult(future.result(), self.fallback_model, attempts + 1, fallback=True, errors=errors)
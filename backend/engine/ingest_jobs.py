@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-flight within the process only
+    fcntl = None
+
+
+class IngestionBusy(RuntimeError):
+    """Another process holds the ingestion lock."""
+
+
+class IngestionJob:
+    """Status of one ingestion run, updated from the worker thread.
+
+    `stage` is one of queued, sources, embedding, indexing, done or failed.
+    While fetching, `source`/`sources` give n of m and `description` the
+    current source. Sources are split and embedded as they arrive, so
+    `chunks_embedded` of `chunks` advance during both the sources and
+    embedding stages. `pipeline` holds the per-stage throughput and peak
+    RSS once the sources have been processed.
+    """
+
+    def __init__(self, options: Optional[dict] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.options = dict(options or {})
+        self.state = "queued"  # queued, running, succeeded, failed
+        self.stage = "queued"
+        self.source = 0
+        self.sources = 0
+        self.description = None
+        self.chunks = 0
+        self.chunks_embedded = 0
+        self.pipeline = None
+        self.index_version = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, stage: Optional[str] = None, **fields) -> None:
+        """Progress callback handed to `ingest_docs`."""
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            for name, value in fields.items():
+                if hasattr(self, name) and not name.startswith("_"):
+                    setattr(self, name, value)
+
+    @property
+    def running(self) -> bool:
+        return self.state in ("queued", "running")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "id": self.id,
+                "options": self.options,
+                "state": self.state,
+                "stage": self.stage,
+                "source": self.source,
+                "sources": self.sources,
+                "description": self.description,
+                "chunks": self.chunks,
+                "chunks_embedded": self.chunks_embedded,
+                "pipeline": self.pipeline,
+                "index_version": self.index_version,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_s": round(end - self.started_at, 2) if self.started_at else None,
+            }
+
+
+class IngestionRunner:
+    """Runs ingestion on a background thread, at most one job at a time.
+
+    `ingest_fn(progress, **options)` does the work and returns the new index version
+    (falsy when nothing was ingested). `on_success` runs after a successful
+    build, e.g. to reload retrievers. A lock file additionally keeps the API
+    and the Streamlit app from rebuilding the same `vector_db/` concurrently.
+    """
+
+    def __init__(self, ingest_fn: Callable, on_success: Optional[Callable] = None, lock_path: Optional[str] = None):
+        self.ingest_fn = ingest_fn
+        self.on_success = on_success
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._job: Optional[IngestionJob] = None
+
+    @property
+    def latest(self) -> Optional[IngestionJob]:
+        return self._job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        job = self._job
+        return job if job is not None and job.id == job_id else None
+
+    def is_running(self) -> bool:
+        job = self._job
+        return job is not None and job.running
+
+    def start(self, **options):
+        """Start a job with `options` for `ingest_fn`, or join the one already running.
+
+        Returns (job, started). Raises IngestionBusy if another process is
+        ingesting.
+        """
+        with self._lock:
+            if self._job is not None and self._job.running:
+                return self._job, False
+            lock_file = self._acquire_file_lock()
+            job = IngestionJob(options)
+            self._job = job
+            threading.Thread(
+                target=self._run, args=(job, lock_file), name=f"rag-ingest-{job.id}", daemon=True
+            ).start()
+            return job, True
+
+    def while_idle(self, fn: Callable):
+        """Call `fn()` while no job can start, here or in another process.
+
+        Returns its result, or None without calling it if ingestion is running.
+        """
+        with self._lock:
+            if self._job is not None and self._job.running:
+                return None
+            try:
+                lock_file = self._acquire_file_lock()
+            except IngestionBusy:
+                return None
+            try:
+                return fn()
+            finally:
+                self._release_file_lock(lock_file)
+
+    def _acquire_file_lock(self):
+        if not self.lock_path or fcntl is None:
+            return None
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise IngestionBusy("Ingestion is already running in another process")
+        return lock_file
+
+    def _run(self, job: IngestionJob, lock_file) -> None:
+        job.update(state="running", started_at=time.time())
+        try:
+            version = self.ingest_fn(job.update, **job.options)
+            if not version:
+                raise RuntimeError("No documents were ingested")
+            job.update("done", state="succeeded", index_version=version)
+            if self.on_success is not None:
+                self.on_success()
+        except Exception as e:
+            traceback.print_exc()
+            job.update("failed", state="failed", error=str(e) or type(e).__name__)
+        finally:
+            job.update(finished_at=time.time())
+            self._release_file_lock(lock_file)
+
+    @staticmethod
+    def _release_file_lock(lock_file) -> None:
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
@@ -0,0 +1,116 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or "
+    "that the this to was what when where which who will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def doc_key(doc) -> Tuple[str, str]:
+    """Identity of a chunk across the vector store and the lexical index."""
+    return (doc.metadata.get("source", ""), doc.page_content)
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over the ingested chunks.
+
+    Built at ingest time next to the Chroma collection and persisted as JSON.
+    Searches honour the same `scheme` metadata filter as the vector store.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # term -> [(doc_id, tf)]
+        self.avg_length = 0.0
+
+    @classmethod
+    def build(cls, docs, **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenize(doc.page_content)
+            index.texts.append(doc.page_content)
+            index.metadatas.append(dict(doc.metadata))
+            index.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                index.postings.setdefault(term, []).append((doc_id, tf))
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def search(self, query: str, k: int = 20, scheme: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Return up to `k` (doc_id, score) pairs, best first."""
+        n_docs = len(self.texts)
+        if not n_docs:
+            return []
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                if scheme is not None and self.metadatas[doc_id].get("scheme") != scheme:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.texts = data["texts"]
+        index.metadatas = data["metadatas"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {term: [tuple(p) for p in plist] for term, plist in data["postings"].items()}
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+
+def reciprocal_rank_fusion(ranked_lists, k: int = 60, limit: Optional[int] = None) -> list:
+    """Fuse several ranked lists of documents with RRF (score = sum 1 / (k + rank)).
+
+    Documents are matched across lists by `doc_key`; the first occurrence is
+    the one returned.
+    """
+    scores: Dict[Tuple[str, str], float] = {}
+    first_seen = {}
+    for docs in ranked_lists:
+        for rank, doc in enumerate(docs, 1):
+            key = doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            first_seen.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    if limit is not None:
+        ordered = ordered[:limit]
+    return [first_seen[key] for key in ordered]
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+
+class LLMClientRegistry:
+    """Bounded registry of ChatGroq clients sharing one keep-alive connection pool.
+
+    Clients are cached per (API key hash, model, temperature) with LRU
+    eviction, so raw keys are never used as dict keys. Every client reuses the
+    same sync and async HTTP clients, which keeps TLS connections to Groq warm
+    across users and requests, and all calls get explicit timeouts.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = 32,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 50,
+        max_retries: int = 2,
+    ):
+        self.max_clients = max_clients
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self._clients: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._http_async_client = None
+
+    @staticmethod
+    def key_id(api_key: Optional[str]) -> str:
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+    def _httpx_settings(self) -> dict:
+        import httpx
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60.0,
+            ),
+        }
+
+    def _shared_http_clients(self):
+        # Created lazily (under self._lock) so importing the registry stays cheap
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.Client(**self._httpx_settings())
+            self._http_async_client = httpx.AsyncClient(**self._httpx_settings())
+        return self._http_client, self._http_async_client
+
+    def get(self, api_key: Optional[str] = None, model_name: str = DEFAULT_MODEL, temperature: float = 0):
+        """Return the ChatGroq client for a key (defaults to GROQ_API_KEY)."""
+        effective_key = api_key or os.getenv("GROQ_API_KEY")
+        cache_key = (self.key_id(effective_key), model_name, temperature)
+
+        with self._lock:
+            llm = self._clients.get(cache_key)
+            if llm is not None:
+                self._clients.move_to_end(cache_key)
+                return llm
+
+            from langchain_groq import ChatGroq
+            http_client, http_async_client = self._shared_http_clients()
+            llm = ChatGroq(
+                model_name=model_name,
+                temperature=temperature,
+                groq_api_key=effective_key,
+                request_timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            self._clients[cache_key] = llm
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return llm
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def close(self) -> None:
+        """Drop all clients and close the shared connection pool (sync side)."""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._http_async_client = None
+
+
+LLM_REGISTRY = LLMClientRegistry(
+    max_clients=int(os.getenv("RAG_LLM_MAX_CLIENTS", "32")),
+    timeout=float(os.getenv("RAG_LLM_TIMEOUT", "60")),
+    connect_timeout=float(os.getenv("RAG_LLM_CONNECT_TIMEOUT", "5")),
+    max_connections=int(os.getenv("RAG_LLM_MAX_CONNECTIONS", "50")),
+    # Retries, deadlines and fallback are handled by generation.Generator
+    max_retries=int(os.getenv("RAG_LLM_SDK_RETRIES", "0")),
+)
+
+
+def get_llm(api_key: Optional[str] = None, model_name: str = DEFAULT_MODEL, temperature: float = 0):
+    """Get a pooled LLM client with optional API key override."""
+    return LLM_REGISTRY.get(api_key, model_name=model_name, temperature=temperature)
@@ -0,0 +1,131 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+PROFILE_ENABLED = os.getenv("RAG_PROFILE", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("RAG_PROFILE_SAMPLE_RATE", "0.01"))  # fraction of requests profiled
+PROFILE_ALLOW_HEADER = os.getenv("RAG_PROFILE_ALLOW_HEADER", "0") == "1"  # honour X-RAG-Profile: 1
+PROFILE_INTERVAL = float(os.getenv("RAG_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("RAG_PROFILE_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/profiles")))
+PROFILE_KEEP = int(os.getenv("RAG_PROFILE_KEEP", "50"))  # newest profiles kept on disk
+# Threads sampled besides the caller: our pools are named "rag-*"; "" samples every thread
+PROFILE_THREAD_PREFIX = os.getenv("RAG_PROFILE_THREAD_PREFIX", "rag-")
+
+# One profile at a time; overlapping samples would mix requests
+_SESSION_LOCK = threading.Lock()
+
+
+class SamplingProfiler:
+    """Wall-clock sampler over `sys._current_frames()` producing folded stacks.
+
+    A daemon thread snapshots the stacks of the starting thread and of threads
+    whose name starts with `thread_prefix` every `interval` seconds. Output is
+    the folded format (`thread;outer;...;inner count`) read by flamegraph.pl,
+    inferno and speedscope.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, thread_prefix: str = PROFILE_THREAD_PREFIX):
+        self.interval = interval
+        self.thread_prefix = thread_prefix
+        self.stacks = Counter()
+        self.samples = 0
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _wanted(self, ident: int, names: dict) -> bool:
+        return ident == self._target or names.get(ident, "").startswith(self.thread_prefix)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or not self._wanted(ident, names):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def write(self, label: str, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP) -> Optional[str]:
+        """Write folded stacks to `directory`, keeping only the newest `keep` files."""
+        if not self.stacks:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(directory, f"{stamp}-{label}-{os.getpid()}-{uuid.uuid4().hex[:6]}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        profiles = sorted(
+            (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".folded")),
+            key=os.path.getmtime,
+        )
+        for old in profiles[:-keep] if keep > 0 else []:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+
+@contextmanager
+def _profile_session(label: str):
+    if not _SESSION_LOCK.acquire(blocking=False):
+        yield None
+        return
+    try:
+        profiler = SamplingProfiler().start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            path = profiler.write(label)
+            if path:
+                print(f"🔬 Profile ({profiler.samples} samples) written to {path}")
+    finally:
+        _SESSION_LOCK.release()
+
+
+def maybe_profile(label: str, requested: bool = False, sample_rate: Optional[float] = None):
+    """Context manager that profiles the enclosed block if this call is sampled.
+
+    Sampled when RAG_PROFILE=1 and a random draw falls under `sample_rate`
+    (default RAG_PROFILE_SAMPLE_RATE), or when `requested` (the request
+    header) and RAG_PROFILE_ALLOW_HEADER=1. Otherwise returns a shared no-op
+    context, so disabled profiling costs one branch.
+    """
+    if requested and PROFILE_ALLOW_HEADER:
+        return _profile_session(label)
+    if not PROFILE_ENABLED:
+        return _NULL_CONTEXT
+    rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if random.random() < rate:
+        return _profile_session(label)
+    return _NULL_CONTEXT
+
+
+_NULL_CONTEXT = nullcontext()
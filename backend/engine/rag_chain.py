@@ -1,19 +1,32 @@
+import asyncio
+import hashlib
+import json
 import os
 import sys
 import threading
 import time
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict
 from dotenv import load_dotenv
 
 # Add current dir to path for local imports
 sys.path.append(os.path.dirname(__file__))
-from router import get_router
+from router import get_router, LocalRouter
+from llm_registry import get_llm, DEFAULT_MODEL
+from generation import Generator
+from profiling import maybe_profile
+from telemetry import (
+    StageTimer, render_metrics, record_generation, STARTUP_SECONDS,
+    QUERIES, CACHE_LOOKUPS, ROUTES, INHERITED_FOLLOWUPS, LLM_ERRORS,
+)
+from semantic_cache import SemanticAnswerCache
+from response_cache import ResponseCache
+from session_store import SessionStore, create_session_store
+from context_packer import pack_context
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from fund_facts import FundFactsStore
+from embedding_backends import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, create_embeddings
+from ingest_jobs import IngestionRunner, IngestionBusy
 
 # Load env from phase2 root
 load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.env")))
@@ -21,10 +34,80 @@ load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.env"
 # Configuration
 DB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../vector_db"))
 
+# Async pipeline limits (see Phase4RAG.aquery)
+MAX_INFLIGHT_QUERIES = int(os.getenv("RAG_MAX_INFLIGHT_QUERIES", "32"))
+RETRIEVAL_WORKERS = int(os.getenv("RAG_RETRIEVAL_WORKERS", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("RAG_BATCH_MAX_CONCURRENCY", "8"))
+
+# Generation policy: per-request deadline, jittered retries on 429/5xx, hedging
+# after the observed p95, circuit breaker and a smaller fallback model
+LLM_MODEL = os.getenv("RAG_LLM_MODEL", DEFAULT_MODEL)
+LLM_FALLBACK_MODEL = os.getenv("RAG_LLM_FALLBACK_MODEL", "llama-3.1-8b-instant") or None
+GENERATOR = Generator(
+    llm_factory=lambda api_key, model_name: get_llm(api_key, model_name=model_name),
+    primary_model=LLM_MODEL,
+    fallback_model=LLM_FALLBACK_MODEL,
+    deadline=float(os.getenv("RAG_LLM_DEADLINE", "30")),
+    fallback_reserve=float(os.getenv("RAG_LLM_FALLBACK_RESERVE", "5")),
+    max_retries=int(os.getenv("RAG_LLM_RETRIES", "2")),
+    hedge=os.getenv("RAG_LLM_HEDGE", "1") == "1",
+    breaker_failures=int(os.getenv("RAG_LLM_BREAKER_FAILURES", "5")),
+    breaker_reset=float(os.getenv("RAG_LLM_BREAKER_RESET", "30")),
+)
+
+# Number of chunks retrieved per query
+RETRIEVAL_K = 20
+# Hybrid retrieval: fuse BM25 and vector rankings (needs lexical_index.json from ingest)
+HYBRID_SEARCH_ENABLED = os.getenv("RAG_HYBRID_SEARCH", "1") == "1"
+HYBRID_K = int(os.getenv("RAG_HYBRID_K", "12"))  # chunks kept after fusion
+# Approximate prompt tokens allotted to retrieved context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Semantic answer cache (paraphrase hits within the same routed scheme)
+SEMANTIC_CACHE_ENABLED = os.getenv("RAG_SEMANTIC_CACHE", "1") == "1"
+SEMANTIC_CACHE = SemanticAnswerCache(
+    threshold=float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    max_entries=int(os.getenv("RAG_SEMANTIC_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("RAG_SEMANTIC_CACHE_TTL", "3600")),
+)
+
+# Persistent exact-match cache (survives restarts, shared by workers)
+RESPONSE_CACHE_ENABLED = os.getenv("RAG_RESPONSE_CACHE", "1") == "1"
+RESPONSE_CACHE = ResponseCache(
+    os.getenv("RAG_RESPONSE_CACHE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/responses.sqlite3"))),
+    ttl_seconds=float(os.getenv("RAG_RESPONSE_CACHE_TTL", "86400")),
+) if RESPONSE_CACHE_ENABLED else None
+
+# Session store: bounded per-session history, idle TTL, optional SQLite sharing
+HISTORY_TURNS = 3  # exchanges kept per session and fed into the prompt
+SESSION_BACKEND = os.getenv("RAG_SESSION_BACKEND", "memory")  # "memory" or "sqlite"
+SESSION_DB_PATH = os.getenv("RAG_SESSION_DB_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/sessions.sqlite3")))
+SESSION_TTL = float(os.getenv("RAG_SESSION_TTL", "3600"))
+MAX_SESSIONS = int(os.getenv("RAG_MAX_SESSIONS", "10000"))
+
+# Version stamp and lexical index written by ingest_docs after each rebuild
+INDEX_VERSION_FILE = os.path.join(DB_DIR, "index_version")
+LEXICAL_INDEX_FILE = os.path.join(DB_DIR, "lexical_index.json")
+FUND_FACTS_FILE = os.path.join(DB_DIR, "fund_facts.json")
+ROUTER_CENTROIDS_FILE = os.path.join(DB_DIR, "router_centroids.json")
+MANIFEST_FILE = os.path.join(DB_DIR, "ingest_manifest.json")
+# Local nearest-centroid router over query embeddings; heuristic router below threshold
+LOCAL_ROUTER_ENABLED = os.getenv("RAG_LOCAL_ROUTER", "1") == "1"
+ROUTER_MIN_CONFIDENCE = float(os.getenv("RAG_ROUTER_MIN_CONFIDENCE", "0.5"))
+# Answer single-fact questions (NAV, AUM, exit load, lock-in, ...) from the facts table without the LLM
+FACT_ANSWERS_ENABLED = os.getenv("RAG_FACT_ANSWERS", "1") == "1"
+INDEX_VERSION_CHECK_INTERVAL = 2.0  # seconds between stamp re-reads
+# Start a background ingestion job when vector_db/ is missing (requests never wait on it)
+AUTO_INGEST = os.getenv("RAG_AUTO_INGEST", "1") == "1"
+# After a failed job, seconds before a query may start another automatic one
+AUTO_INGEST_RETRY_AFTER = float(os.getenv("RAG_AUTO_INGEST_RETRY_AFTER", "600"))
+INGEST_LOCK_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/ingest.lock"))
+
 _VECTOR_DB_LOCK = threading.Lock()
 _VECTOR_DB_READY = False
 
-# Embeddings cache for performance optimization
+# Embeddings cache for performance optimization. The embedding backend (RAG_EMBEDDING_BACKEND),
+# Chroma and LangChain are imported inside the functions that need them to keep process start fast.
 _EMBEDDINGS_CACHE = None
 _EMBEDDINGS_LOCK = threading.Lock()
 
@@ -37,49 +120,157 @@ def get_embeddings():
     
     with _EMBEDDINGS_LOCK:
         if _EMBEDDINGS_CACHE is None:
-            print("🔄 Loading embeddings model (one-time initialization)...")
+            print(f"🔄 Loading embeddings model on {EMBEDDING_BACKEND} (one-time initialization)...")
             start = time.time()
-            _EMBEDDINGS_CACHE = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+            _EMBEDDINGS_CACHE = create_embeddings()
             elapsed = time.time() - start
             print(f"✓ Embeddings model loaded in {elapsed:.2f}s")
         return _EMBEDDINGS_CACHE
 
 
+# Bounded pool for CPU-bound embedding + Chroma search off the event loop
+_RETRIEVAL_EXECUTOR = None
+_RETRIEVAL_EXECUTOR_LOCK = threading.Lock()
+
+def _get_retrieval_executor() -> ThreadPoolExecutor:
+    global _RETRIEVAL_EXECUTOR
+    if _RETRIEVAL_EXECUTOR is None:
+        with _RETRIEVAL_EXECUTOR_LOCK:
+            if _RETRIEVAL_EXECUTOR is None:
+                _RETRIEVAL_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rag-retrieval"
+                )
+    return _RETRIEVAL_EXECUTOR
+
+
+_INDEX_VERSION = None
+_INDEX_VERSION_CHECKED_AT = 0.0
+
+def get_index_version(force: bool = False) -> Optional[str]:
+    """Return the current index version stamp (re-read at most every few seconds).
+    
+    Other processes may rebuild the index, so the stamp file is the source of
+    truth; callers pass `force=True` right after an in-process rebuild.
+    """
+    global _INDEX_VERSION, _INDEX_VERSION_CHECKED_AT
+    now = time.monotonic()
+    if force or now - _INDEX_VERSION_CHECKED_AT > INDEX_VERSION_CHECK_INTERVAL:
+        try:
+            with open(INDEX_VERSION_FILE) as f:
+                _INDEX_VERSION = f.read().strip() or None
+        except FileNotFoundError:
+            _INDEX_VERSION = None
+        _INDEX_VERSION_CHECKED_AT = now
+    return _INDEX_VERSION
+
+
+def get_cache_stats() -> dict:
+    stats = {"semantic": SEMANTIC_CACHE.stats()}
+    if RESPONSE_CACHE_ENABLED:
+        stats["exact"] = RESPONSE_CACHE.stats()
+    return stats
+
+
 def _is_vector_db_ready() -> bool:
-    if not os.path.isdir(DB_DIR):
-        return False
-    try:
-        with os.scandir(DB_DIR) as it:
-            return any(True for _ in it)
-    except FileNotFoundError:
-        return False
+    # ingest_docs stamps the index last, so a missing stamp means never built or mid full rebuild
+    return os.path.isfile(INDEX_VERSION_FILE)
 
 
 def ensure_vector_db() -> bool:
-    """Ensure persisted Chroma DB exists; build it if missing.
+    """Check that the persisted Chroma DB exists and no rebuild is in progress.
     
-    Returns True if the database is ready, False otherwise.
-    Will attempt automatic ingestion if the database is missing.
+    Returns True if the database is ready, False otherwise. If it is missing,
+    a background ingestion job is started (RAG_AUTO_INGEST) rather than
+    building it inside the caller's request.
     """
     global _VECTOR_DB_READY
-    if _VECTOR_DB_READY and _is_vector_db_ready():
+    # Readiness is cached; notify_index_rebuilt() clears it on rebuild events
+    if _VECTOR_DB_READY:
         return True
 
     with _VECTOR_DB_LOCK:
         if _is_vector_db_ready():
             _VECTOR_DB_READY = True
             return True
+        if INGESTION_JOBS.while_idle(_adopt_legacy_vector_db):
+            get_index_version(force=True)
+            _VECTOR_DB_READY = True
+            return True
 
-        # Attempt automatic build if missing
-        try:
-            print("🏗️ Vector database missing. Attempting automatic ingestion...")
-            from backend.data.ingest import ingest_docs
-            ingest_docs()
-            _VECTOR_DB_READY = _is_vector_db_ready()
-            return _VECTOR_DB_READY
-        except Exception as e:
-            print(f"❌ Automatic ingestion failed: {e}")
-            return False
+        if AUTO_INGEST and _auto_ingest_failure() is None:
+            try:
+                job, started = INGESTION_JOBS.start()
+                if started:
+                    print(f"🏗️ Vector database missing. Started background ingestion job {job.id}")
+            except IngestionBusy as e:
+                print(f"⏳ {e}")
+        return False
+
+
+def _adopt_legacy_vector_db() -> bool:
+    """Stamp a Chroma DB built before stamps and manifests existed so it is served as is.
+    
+    An unstamped DB with a manifest is a full rebuild in progress (or one
+    that died), so only a manifest-less one is adopted. The next ingest
+    still rebuilds it: its chunks can't be matched to sources.
+    """
+    if _is_vector_db_ready():  # stamped while we waited for the ingestion lock
+        return True
+    if os.path.exists(MANIFEST_FILE) or not os.path.isfile(os.path.join(DB_DIR, "chroma.sqlite3")):
+        return False
+    from backend.data.ingest import write_index_version
+    print(f"📦 Serving the existing vector database at {DB_DIR}, built before index stamps")
+    write_index_version()
+    return True
+
+
+def _auto_ingest_failure() -> Optional[str]:
+    """Error of the last job if it failed within RAG_AUTO_INGEST_RETRY_AFTER, else None.
+    
+    Keeps every query from relaunching a rebuild that is failing anyway
+    (no browser, network down); POST /ingest can still start one.
+    """
+    job = INGESTION_JOBS.latest
+    if job is None or job.state != "failed":
+        return None
+    if time.time() - (job.finished_at or time.time()) >= AUTO_INGEST_RETRY_AFTER:
+        return None
+    return job.error
+
+
+def notify_index_rebuilt() -> None:
+    """Signal an in-process rebuild: re-check readiness and reload retrievers."""
+    global _VECTOR_DB_READY
+    _VECTOR_DB_READY = False
+    get_index_version(force=True)
+
+
+def _run_ingestion(progress, **options) -> Optional[str]:
+    from backend.data.ingest import ingest_docs
+    return ingest_docs(progress=progress, **options)
+
+# Background rebuilds of vector_db/, one at a time (see ingest_jobs.py)
+INGESTION_JOBS = IngestionRunner(_run_ingestion, on_success=notify_index_rebuilt, lock_path=INGEST_LOCK_FILE)
+
+
+def start_ingestion(scheme: Optional[str] = None, document_type: Optional[str] = None,
+                    full: bool = False, force: bool = False) -> tuple:
+    """Start a background ingest or join the running one: (job dict, started).
+    
+    Incremental unless `full`; see `ingest_docs` for the options. Queries keep
+    using the current index until the new version stamp is written.
+    """
+    job, started = INGESTION_JOBS.start(scheme=scheme, document_type=document_type, full=full, force=force)
+    return job.to_dict(), started
+
+
+def get_ingestion_status(job_id: Optional[str] = None) -> Optional[dict]:
+    """Status of job `job_id`, or of the latest job when omitted."""
+    job = INGESTION_JOBS.get(job_id) if job_id else INGESTION_JOBS.latest
+    return job.to_dict() if job is not None else None
+
+# Schemes with their own metadata-filtered retriever
+SCHEME_SLUGS = ["hdfc_large_cap", "hdfc_flexi_cap", "hdfc_elss"]
 
 # Official HDFC Scheme Page Mapping
 HDFC_SOURCE_LINKS = {
@@ -118,66 +309,207 @@ Instructions for the Assistant:
 Current Question: {question}
 Answer:"""
 
-# LLM and VectorStore cache
-_LLM_CACHE = {} # key -> instance
-_VECTORSTORE_CACHE = None
-
-def get_llm(api_key: Optional[str] = None):
-    """Get or create LLM instance with optional API key override."""
-    global _LLM_CACHE
+class RetrievalRegistry:
+    """Chroma store plus one ready retriever per scheme slug (None = unfiltered).
     
-    # Use provided key or fallback to env
-    effective_key = api_key or os.getenv("GROQ_API_KEY")
+    Built once per index version so the per-query path is a dict lookup and
+    the search itself. When a lexical index is present, searches fuse BM25
+    and vector rankings with reciprocal-rank fusion.
+    """
+    def __init__(self, vectorstore, index_version: Optional[str], lexical_index: Optional[BM25Index] = None):
+        self.vectorstore = vectorstore
+        self.index_version = index_version
+        self.lexical_index = lexical_index
+        self.search_kwargs = {None: {"k": RETRIEVAL_K}}
+        for slug in SCHEME_SLUGS:
+            self.search_kwargs[slug] = {"k": RETRIEVAL_K, "filter": _scheme_where(slug)}
+        self.retrievers = {
+            slug: vectorstore.as_retriever(search_kwargs=kwargs)
+            for slug, kwargs in self.search_kwargs.items()
+        }
+
+    def _kwargs(self, scheme_filter: Optional[str]) -> dict:
+        kwargs = self.search_kwargs.get(scheme_filter)
+        if kwargs is None:
+            kwargs = {"k": RETRIEVAL_K, "filter": _scheme_where(scheme_filter)}
+        return kwargs
+
+    def retriever(self, scheme_filter: Optional[str] = None):
+        retriever = self.retrievers.get(scheme_filter)
+        if retriever is None:
+            retriever = self.vectorstore.as_retriever(search_kwargs=self._kwargs(scheme_filter))
+        return retriever
+
+    def search_by_vector(self, vector, scheme_filter: Optional[str] = None):
+        return self.vectorstore.similarity_search_by_vector(vector, **self._kwargs(scheme_filter))
+
+    def search(self, query: str, vector, scheme_filter: Optional[str] = None):
+        """Hybrid search for a query whose embedding is already computed."""
+        return self.fuse(query, self.search_by_vector(vector, scheme_filter), scheme_filter)
+
+    def fuse(self, query: str, vector_docs: list, scheme_filter: Optional[str] = None) -> list:
+        if self.lexical_index is None:
+            return vector_docs
+        from langchain_core.documents import Document
+        hits = self.lexical_index.search(query, k=RETRIEVAL_K, scheme=scheme_filter)
+        lexical_docs = [
+            Document(page_content=self.lexical_index.texts[doc_id], metadata=self.lexical_index.metadatas[doc_id])
+            for doc_id, _ in hits
+        ]
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], limit=HYBRID_K)
+
+
+_RETRIEVAL_REGISTRY = None
+_RETRIEVAL_REGISTRY_LOCK = threading.Lock()
+
+def get_retrieval_registry() -> RetrievalRegistry:
+    """Return the retrieval registry, (re)building it only when the index changed."""
+    global _RETRIEVAL_REGISTRY, _VECTOR_DB_READY
+    registry = _RETRIEVAL_REGISTRY
+    if registry is not None and registry.index_version == get_index_version():
+        return registry
     
-    if effective_key in _LLM_CACHE:
-        return _LLM_CACHE[effective_key]
+    with _RETRIEVAL_REGISTRY_LOCK:
+        index_version = get_index_version()
+        registry = _RETRIEVAL_REGISTRY
+        if registry is not None and registry.index_version == index_version:
+            return registry
+        
+        if registry is not None:
+            # Index rebuilt since the registry was created: re-check the directory
+            _VECTOR_DB_READY = False
+        if not ensure_vector_db():
+            if INGESTION_JOBS.is_running():
+                raise FileNotFoundError("Vector database is being rebuilt. Please retry shortly.")
+            error = _auto_ingest_failure()
+            if error is not None:
+                raise FileNotFoundError(
+                    f"Vector database not found and ingestion failed: {error}. "
+                    f"Fix the cause and run ingestion, or wait {AUTO_INGEST_RETRY_AFTER:.0f}s for an automatic retry."
+                )
+            raise FileNotFoundError("Vector database not found. Please run ingestion first.")
+        
+        from langchain_chroma import Chroma
+        vectorstore = Chroma(persist_directory=DB_DIR, embedding_function=get_embeddings())
+        lexical_index = None
+        if HYBRID_SEARCH_ENABLED and os.path.exists(LEXICAL_INDEX_FILE):
+            lexical_index = BM25Index.load(LEXICAL_INDEX_FILE)
+        # ensure_vector_db may have just built the index and written a new stamp
+        _RETRIEVAL_REGISTRY = RetrievalRegistry(vectorstore, get_index_version(), lexical_index)
+        return _RETRIEVAL_REGISTRY
+
+_FUND_FACTS = None  # (index_version, FundFactsStore)
+_FUND_FACTS_LOCK = threading.Lock()
+
+def get_fund_facts() -> FundFactsStore:
+    """Structured facts table written by ingest_docs, reloaded when the index changes."""
+    global _FUND_FACTS
+    index_version = get_index_version()
+    cached = _FUND_FACTS
+    if cached is not None and cached[0] == index_version:
+        return cached[1]
+    with _FUND_FACTS_LOCK:
+        if _FUND_FACTS is None or _FUND_FACTS[0] != index_version:
+            store = FundFactsStore.load(FUND_FACTS_FILE) if os.path.exists(FUND_FACTS_FILE) else FundFactsStore()
+            _FUND_FACTS = (index_version, store)
+        return _FUND_FACTS[1]
+
+_LOCAL_ROUTER = None
+_LOCAL_ROUTER_LOCK = threading.Lock()
+
+def get_local_router() -> LocalRouter:
+    """Load router centroids saved by ingestion, or compute them from the examples."""
+    global _LOCAL_ROUTER
+    if _LOCAL_ROUTER is not None:
+        return _LOCAL_ROUTER
+    with _LOCAL_ROUTER_LOCK:
+        if _LOCAL_ROUTER is None:
+            if os.path.exists(ROUTER_CENTROIDS_FILE):
+                _LOCAL_ROUTER = LocalRouter.load(ROUTER_CENTROIDS_FILE)
+            else:
+                _LOCAL_ROUTER = LocalRouter.build(get_embeddings(), EMBEDDING_MODEL_NAME)
+        return _LOCAL_ROUTER
+
+def get_readiness() -> dict:
+    """Which warm components are loaded (all True once warmup has finished)."""
+    return {
+        "embeddings": _EMBEDDINGS_CACHE is not None,
+        "index": _RETRIEVAL_REGISTRY is not None,
+        "router": not LOCAL_ROUTER_ENABLED or _LOCAL_ROUTER is not None,
+    }
+
+def get_vectorstore():
+    """Get the shared Chroma store, building the database first if needed."""
+    return get_retrieval_registry().vectorstore
+
+def build_context(docs):
+    """Pack retrieved chunks into the prompt context; returns (context, docs used).
     
-    llm = ChatGroq(
-        model_name="llama-3.3-70b-versatile", 
-        temperature=0,
-        groq_api_key=effective_key
-    )
-    _LLM_CACHE[effective_key] = llm
-    return llm
+    Overlapping chunks are stitched back together and the result is filled
+    into CONTEXT_TOKEN_BUDGET in priority order: live data, numeric chunks,
+    then retrieval rank.
+    """
+    return pack_context(docs, token_budget=CONTEXT_TOKEN_BUDGET)
+
+def format_docs(docs):
+    return build_context(docs)[0]
+
+def _scheme_where(scheme_filter):
+    return {"scheme": scheme_filter} if scheme_filter else None
 
 def get_rag_chain(scheme_filter=None, api_key: Optional[str] = None):
     """Create a RAG chain using modern langchain API (no deprecated chains)."""
-    global _VECTORSTORE_CACHE
-    if not ensure_vector_db():
-        raise FileNotFoundError("Vector database not found. Please run ingestion first.")
-        
-    embeddings = get_embeddings()
-    
-    if _VECTORSTORE_CACHE is None:
-        _VECTORSTORE_CACHE = Chroma(persist_directory=DB_DIR, embedding_function=embeddings)
-    
+    # Retrievers are prebuilt per scheme (k is high enough to catch the live data chunk)
+    retriever = get_retrieval_registry().retriever(scheme_filter)
     llm = get_llm(api_key)
     
-    # Increase k to ensure we catch the live data chunk even if ranked slightly lower
-    search_kwargs = {"k": 20}
-    if scheme_filter:
-        search_kwargs["filter"] = {"scheme": scheme_filter}
+    return retriever, llm, format_docs
+
+def batch_similarity_search(queries: List[str], scheme_filters: List[Optional[str]], vectors: Optional[List[list]] = None) -> List[list]:
+    """Retrieve documents for many queries with one embedding call.
     
-    retriever = _VECTORSTORE_CACHE.as_retriever(search_kwargs=search_kwargs)
+    All queries are embedded together via `embed_documents`, then queries that
+    share a scheme filter are sent to Chroma as a single multi-vector query
+    and fused with BM25 results like single queries.
+    Returns one list of Documents per input query, in input order.
+    """
+    from langchain_core.documents import Document
+    registry = get_retrieval_registry()
+    vectorstore = registry.vectorstore
+    if vectors is None:
+        vectors = get_embeddings().embed_documents(queries)
     
-    # Create a simple chain using LCEL (LangChain Expression Language)
-    def format_docs(docs):
-        # PRIORITY 1: is_live chunks
-        # PRIORITY 2: chunks with currency symbols or numbers
-        def sort_key(d):
-            is_live = d.metadata.get("is_live", False)
-            has_numbers = any(c.isdigit() for c in d.page_content) and "₹" in d.page_content
-            return (is_live, has_numbers)
-            
-        sorted_docs = sorted(docs, key=sort_key, reverse=True)
-        return "\n\n".join([doc.page_content for doc in sorted_docs])
+    groups: Dict[Optional[str], List[int]] = {}
+    for idx, scheme_filter in enumerate(scheme_filters):
+        groups.setdefault(scheme_filter, []).append(idx)
     
-    return retriever, llm, format_docs
+    results: List[list] = [[] for _ in queries]
+    for scheme_filter, indices in groups.items():
+        res = vectorstore._collection.query(
+            query_embeddings=[vectors[i] for i in indices],
+            n_results=RETRIEVAL_K,
+            where=_scheme_where(scheme_filter),
+            include=["documents", "metadatas"],
+        )
+        for pos, idx in enumerate(indices):
+            vector_docs = [
+                Document(page_content=text, metadata=meta or {})
+                for text, meta in zip(res["documents"][pos], res["metadatas"][pos])
+            ]
+            results[idx] = registry.fuse(queries[idx], vector_docs, scheme_filter)
+    return results
 
 class Phase4RAG:
     """Orchestrator for Phase 4 RAG with Memory, Routing, and Session tracking."""
-    def __init__(self):
-        self.sessions = {} # session_id -> {chat_history, last_scheme, api_key}
+    def __init__(self, session_store: Optional[SessionStore] = None):
+        self.sessions = session_store or create_session_store(
+            SESSION_BACKEND,
+            path=SESSION_DB_PATH,
+            history_turns=HISTORY_TURNS,
+            ttl_seconds=SESSION_TTL,
+            max_sessions=MAX_SESSIONS,
+        )
+        self._inflight = None # asyncio.Semaphore, created on first aquery
     
     def warmup(self):
         """Pre-load all expensive components to optimize first query performance."""
@@ -187,17 +519,26 @@ class Phase4RAG:
         # 1. Pre-load embeddings model
         get_embeddings()
         
-        # 2. Check vector database readiness
+        # 2. Open the vector store and prebuild per-scheme retrievers
         print("🔄 Checking vector database...")
         start_db = time.time()
-        if ensure_vector_db():
+        try:
+            get_retrieval_registry()
             elapsed_db = time.time() - start_db
-            print(f"✓ Vector database ready in {elapsed_db:.2f}s")
+            print(f"✓ Vector database and retrievers ready in {elapsed_db:.2f}s")
+        except FileNotFoundError as e:
+            print(f"⚠️ {e}")
             
-        # 3. Component initialization complete
-        print("✓ Engine components ready (Heuristic routing enabled)")
+        # 3. Local router centroids and the facts table
+        get_fund_facts()
+        if LOCAL_ROUTER_ENABLED:
+            get_local_router()
+            print("✓ Engine components ready (Local embedding routing enabled)")
+        else:
+            print("✓ Engine components ready (Heuristic routing enabled)")
         
         elapsed_total = time.time() - start_total
+        STARTUP_SECONDS.labels("warmup").set(elapsed_total)
         print(f"✅ Warmup complete in {elapsed_total:.2f}s\n")
 
     def is_ready(self) -> bool:
@@ -205,13 +546,32 @@ class Phase4RAG:
         return ensure_vector_db()
 
     def get_session_state(self, session_id: str):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
-                "chat_history": [],
-                "last_scheme": "general",
-                "api_key": None
-            }
-        return self.sessions[session_id]
+        """Snapshot of a session's state; mutate only via `self.sessions.locked`."""
+        return self.sessions.get(session_id)
+
+    def _begin(self, user_query: str, session_id: str, api_key: Optional[str], timer: StageTimer):
+        """Embed and route the query, then snapshot the session history it needs.
+        
+        Blocking (embedding), so async callers run it on the retrieval pool.
+        The vector is reused by the caches and the search.
+        """
+        vector = None
+        if LOCAL_ROUTER_ENABLED:
+            with timer.stage("embed"):
+                vector = get_embeddings().embed_query(user_query)
+        with timer.stage("route"), self.sessions.locked(session_id) as state:
+            route_res, scheme_slug, official_links = self._route(user_query, state, api_key, vector)
+            history = list(state["chat_history"])
+            session_api_key = state["api_key"]
+        return route_res, scheme_slug, official_links, history, session_api_key, vector
+
+    def route_query(self, user_query: str, vector=None):
+        """Route with the local embedding router, falling back to the heuristic one."""
+        if vector is not None and LOCAL_ROUTER_ENABLED:
+            route_res = get_local_router().route(vector)
+            if route_res.confidence >= ROUTER_MIN_CONFIDENCE:
+                return route_res
+        return self.heuristic_router(user_query)
 
     def heuristic_router(self, query: str):
         """Locally classify query without an API call to save costs/limits."""
@@ -241,15 +601,14 @@ class Phase4RAG:
                 
         return RouteRes(classification, scheme)
 
-    def query(self, user_query: str, session_id: str = "default", api_key: Optional[str] = None):
-        state = self.get_session_state(session_id)
-        
+    def _route(self, user_query: str, state: dict, api_key: Optional[str], vector=None):
+        """Resolve routing and official links for a query (no I/O)."""
         # Update session API key if provided
         if api_key:
             state["api_key"] = api_key
             
-        # 1. Route the query (HEURISTIC - 0 API Calls)
-        route_res = self.heuristic_router(user_query)
+        # 1. Route the query (local embedding router / heuristic - 0 API Calls)
+        route_res = self.route_query(user_query, vector)
         
         # 2. Logic for Scheme Detection & Inheritance
         if route_res.classification == "general":
@@ -261,6 +620,8 @@ class Phase4RAG:
             else:
                 # Inherit last fund for follow-ups (e.g. "What is its NAV?")
                 scheme_slug = state["last_scheme"]
+                INHERITED_FOLLOWUPS.inc()
+        ROUTES.labels(route_res.classification, scheme_slug).inc()
         
         # Only update last_scheme if we actually identified a specific fund
         if scheme_slug != "general":
@@ -281,21 +642,59 @@ class Phase4RAG:
                 "url": HDFC_SOURCE_LINKS["sip_education"]
             })
 
-        # 4. Get RAG chain components
-        retriever, llm, format_docs = get_rag_chain(
-            scheme_filter=scheme_slug if scheme_slug != "general" else None,
-            api_key=state["api_key"]
-        )
+        return route_res, scheme_slug, official_links
+
+    def _answer_from_facts(self, user_query: str, scheme_slug: str, official_links: list, timer: StageTimer) -> Optional[dict]:
+        """LLM-free answer for single-fact questions about a known scheme, if possible."""
+        if not FACT_ANSWERS_ENABLED or scheme_slug == "general":
+            return None
+        with timer.stage("facts"):
+            fact = get_fund_facts().answer(user_query, scheme_slug)
+        CACHE_LOOKUPS.labels("facts", "miss" if fact is None else "hit").inc()
+        if fact is None:
+            return None
+        return {"answer": fact["answer"], "sources": fact["sources"], "official_links": official_links}
+
+    def _retrieve(self, user_query: str, scheme_slug: str, timer: StageTimer, history_digest: str = "", vector=None):
+        """Run the blocking part of the pipeline: cache lookups, embedding and search.
         
-        # 5. Retrieve relevant documents
-        docs = retriever.invoke(user_query)
-        context = format_docs(docs)
+        Returns (vector, cached, docs, context). On a cache hit `cached`
+        holds the stored result and the remaining fields are None. `vector`
+        is the query embedding if the router already computed it.
+        """
+        # 4a. Exact-match cache: identical question, scheme and history
+        if RESPONSE_CACHE_ENABLED:
+            with timer.stage("exact_cache"):
+                cached = RESPONSE_CACHE.get(user_query, scheme_slug, history_digest, get_index_version())
+            CACHE_LOOKUPS.labels("exact", "miss" if cached is None else "hit").inc()
+            if cached is not None:
+                return vector, cached, None, None
+        
+        # 4b. Embed once; the vector serves both the semantic cache and the search
+        if vector is None:
+            with timer.stage("embed"):
+                vector = get_embeddings().embed_query(user_query)
+        if SEMANTIC_CACHE_ENABLED:
+            with timer.stage("semantic_cache"):
+                cached = SEMANTIC_CACHE.lookup(scheme_slug, vector, get_index_version())
+            CACHE_LOOKUPS.labels("semantic", "miss" if cached is None else "hit").inc()
+            if cached is not None:
+                return vector, cached, None, None
         
+        # 5. Retrieve relevant documents
+        scheme_filter = scheme_slug if scheme_slug != "general" else None
+        with timer.stage("retrieve"):
+            docs = get_retrieval_registry().search(user_query, vector, scheme_filter)
+        with timer.stage("pack_context"):
+            context, docs = build_context(docs)
+        return vector, None, docs, context
+
+    def _build_prompt(self, user_query: str, history: list, context: str) -> str:
         # 6. Format chat history
         chat_history_str = "\n".join([
             f"Human: {msg['question']}\nAssistant: {msg['answer']}" 
-            for msg in state["chat_history"][-3:]  # Last 3 exchanges
-        ]) if state["chat_history"] else "No previous conversation."
+            for msg in history[-HISTORY_TURNS:]  # Last 3 exchanges
+        ]) if history else "No previous conversation."
         
         # 7. Generate answer using LLM
         prompt = QA_PROMPT_TEMPLATE.format(
@@ -306,25 +705,317 @@ class Phase4RAG:
         
         # Update system instructions for numerical priority
         instruction_tweak = "\nPRIORITY: If the context contains 'Live Data' (indicated by 'is_live: True' or currency symbols), you MUST prioritize the numerical values (NAV, AUM) from those sections."
+        return prompt + instruction_tweak
+
+    def _routing_info(self, route_res, scheme_slug: str) -> dict:
+        return {
+            "classification": route_res.classification,
+            "scheme": scheme_slug,
+            "inherited": route_res.classification == "scheme_specific" and (not route_res.scheme or str(route_res.scheme).lower() in ["none", "null", "undefined"])
+        }
+
+    def _response_metadata(self, route_res, scheme_slug: str, official_links: list, docs) -> dict:
+        return {
+            "sources": list(set([doc.metadata.get("description", "Unknown Source") for doc in docs])),
+            "official_links": official_links,
+            "routing": self._routing_info(route_res, scheme_slug)
+        }
+
+    def _finalize_cached(self, user_query: str, state: dict, route_res, scheme_slug: str, cached: dict):
+        """Build a response from a semantic cache hit and record it in history."""
+        state["chat_history"].append({
+            "question": user_query,
+            "answer": cached["answer"]
+        })
+        return {
+            "answer": cached["answer"],
+            "sources": list(cached["sources"]),
+            "official_links": [dict(link) for link in cached["official_links"]],
+            "routing": self._routing_info(route_res, scheme_slug)
+        }
+
+    @staticmethod
+    def _history_digest(history: list) -> str:
+        """Digest of the exchanges that feed the prompt (empty for a new session)."""
+        recent = history[-HISTORY_TURNS:]
+        if not recent:
+            return ""
+        return hashlib.sha256(json.dumps(recent, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _remember(self, scheme_slug: str, user_query: str, vector, result: dict, history_digest: str = ""):
+        if not result.get("answer"):
+            return
+        payload = {
+            "answer": result["answer"],
+            "sources": list(result["sources"]),
+            "official_links": [dict(link) for link in result["official_links"]],
+        }
+        index_version = get_index_version()
+        if SEMANTIC_CACHE_ENABLED:
+            SEMANTIC_CACHE.store(scheme_slug, user_query, vector, payload, index_version)
+        if RESPONSE_CACHE_ENABLED:
+            RESPONSE_CACHE.put(user_query, scheme_slug, history_digest, index_version, payload)
+
+    def _store(self, session_id: str, user_query: str, route_res, scheme_slug: str, official_links: list, docs,
+               answer: str, vector, history_digest: str) -> dict:
+        """Record a generated answer in the session and the answer caches.
         
-        answer = llm.invoke(prompt + instruction_tweak).content
-        
+        Both may be SQLite-backed, so the async paths run this on the retrieval pool.
+        """
+        with self.sessions.locked(session_id) as state:
+            result = self._finalize(user_query, state, route_res, scheme_slug, official_links, docs, answer)
+        self._remember(scheme_slug, user_query, vector, result, history_digest)
+        return result
+
+    def _store_cached(self, session_id: str, user_query: str, route_res, scheme_slug: str, cached: dict) -> dict:
+        with self.sessions.locked(session_id) as state:
+            return self._finalize_cached(user_query, state, route_res, scheme_slug, cached)
+
+    def _finalize(self, user_query: str, state: dict, route_res, scheme_slug: str, official_links: list, docs, answer: str):
         # 8. Update chat history
         state["chat_history"].append({
             "question": user_query,
             "answer": answer
         })
         
-        return {
-            "answer": answer,
-            "sources": list(set([doc.metadata.get("description", "Unknown Source") for doc in docs])),
-            "official_links": official_links,
-            "routing": {
-                "classification": route_res.classification,
-                "scheme": scheme_slug,
-                "inherited": route_res.classification == "scheme_specific" and (not route_res.scheme or str(route_res.scheme).lower() in ["none", "null", "undefined"])
-            }
-        }
+        return {"answer": answer, **self._response_metadata(route_res, scheme_slug, official_links, docs)}
+
+    @staticmethod
+    def _finish(result: dict, timer: StageTimer, path: str, answered_by: str, include_timings: bool) -> dict:
+        QUERIES.labels(path, answered_by).inc()
+        timings = timer.finish()
+        if include_timings:
+            result["timings"] = timings
+        return result
+
+    @staticmethod
+    def _record_failure(path: str):
+        LLM_ERRORS.labels("failed").inc()
+        QUERIES.labels(path, "error").inc()
+
+    def _generate(self, prompt: str, api_key: Optional[str], timer: StageTimer, path: str) -> str:
+        try:
+            with timer.stage("llm"):
+                generation = GENERATOR.generate(prompt, api_key)
+        except Exception:
+            self._record_failure(path)
+            raise
+        record_generation(generation.model, generation.outcome, generation.errors, generation.usage)
+        return generation.text
+
+    async def _agenerate(self, prompt: str, api_key: Optional[str], timer: StageTimer, path: str) -> str:
+        try:
+            with timer.stage("llm"):
+                generation = await GENERATOR.agenerate(prompt, api_key)
+        except Exception:
+            self._record_failure(path)
+            raise
+        record_generation(generation.model, generation.outcome, generation.errors, generation.usage)
+        return generation.text
+
+    def query(self, user_query: str, session_id: str = "default", api_key: Optional[str] = None,
+              include_timings: bool = False, profile: bool = False):
+        """Answer a question in a session. `profile` asks for a sampling profile of this call."""
+        with maybe_profile("query", profile):
+            return self._query(user_query, session_id, api_key, include_timings)
+
+    def _query(self, user_query: str, session_id: str, api_key: Optional[str], include_timings: bool):
+        timer = StageTimer()
+        route_res, scheme_slug, official_links, history, session_api_key, vector = self._begin(user_query, session_id, api_key, timer)
+        fact_answer = self._answer_from_facts(user_query, scheme_slug, official_links, timer)
+        if fact_answer is not None:
+            result = self._store_cached(session_id, user_query, route_res, scheme_slug, fact_answer)
+            return self._finish(result, timer, "query", "facts", include_timings)
+        history_digest = self._history_digest(history)
+        vector, cached, docs, context = self._retrieve(user_query, scheme_slug, timer, history_digest, vector)
+        if cached is not None:
+            result = self._store_cached(session_id, user_query, route_res, scheme_slug, cached)
+            return self._finish(result, timer, "query", "cache", include_timings)
+        with timer.stage("prompt"):
+            prompt = self._build_prompt(user_query, history, context)
+        answer = self._generate(prompt, session_api_key, timer, "query")
+        with timer.stage("store"):
+            result = self._store(session_id, user_query, route_res, scheme_slug, official_links, docs, answer,
+                                 vector, history_digest)
+        return self._finish(result, timer, "query", "llm", include_timings)
+
+    def query_many(self, user_queries: List[str], api_key: Optional[str] = None, max_concurrency: Optional[int] = None):
+        """Answer a batch of independent questions.
+        
+        Each question is routed on its own (no shared history or scheme
+        inheritance), retrieval is batched through `batch_similarity_search`,
+        and LLM calls fan out through GENERATOR with at most `max_concurrency`
+        in flight, clamped to 1..BATCH_MAX_CONCURRENCY. GENERATOR's 16-worker
+        LLM pool, shared with every other request, is the real upper limit.
+        Failed items carry an `error` message instead of aborting the batch.
+        """
+        if not user_queries:
+            return []
+        
+        # Stage histograms get one sample per batch; there is no per-request total
+        timer = StageTimer()
+        # One embedding call serves both routing and retrieval
+        with timer.stage("embed"):
+            vectors = get_embeddings().embed_documents(user_queries)
+        states = [self.sessions.new_state() for _ in user_queries]
+        with timer.stage("route"):
+            routed = [self._route(q, state, api_key, v) for q, state, v in zip(user_queries, states, vectors)]
+        
+        scheme_filters = [scheme_slug if scheme_slug != "general" else None for _, scheme_slug, _ in routed]
+        with timer.stage("retrieve"):
+            retrieved = batch_similarity_search(user_queries, scheme_filters, vectors)
+        with timer.stage("pack_context"):
+            packed = [build_context(docs) for docs in retrieved]
+        docs_per_query = [docs for _, docs in packed]
+        
+        with timer.stage("prompt"):
+            prompts = [
+                self._build_prompt(q, [], context)
+                for q, (context, _) in zip(user_queries, packed)
+            ]
+        def generate(prompt):
+            try:
+                return self._generate(prompt, api_key, StageTimer(), "batch")
+            except Exception as e:
+                return e
+        
+        workers = max(1, min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(generate, prompts))
+        
+        results = []
+        for q, state, (route_res, scheme_slug, official_links), docs, out in zip(
+            user_queries, states, routed, docs_per_query, outputs
+        ):
+            if isinstance(out, Exception):
+                result = {"answer": "", "error": str(out),
+                          **self._response_metadata(route_res, scheme_slug, official_links, docs)}
+            else:
+                result = self._finalize(q, state, route_res, scheme_slug, official_links, docs, out)
+                QUERIES.labels("batch", "llm").inc()
+            results.append(result)
+        return results
+
+    async def aquery(self, user_query: str, session_id: str = "default", api_key: Optional[str] = None,
+                     include_timings: bool = False, profile: bool = False):
+        """Async variant of `query` that never blocks the event loop.
+        
+        Embedding and Chroma search run on a bounded thread pool, the LLM call
+        goes through GENERATOR's async path, and at most MAX_INFLIGHT_QUERIES queries
+        are processed concurrently; extra callers wait for a free slot.
+        """
+        with maybe_profile("aquery", profile):
+            return await self._aquery(user_query, session_id, api_key, include_timings)
+
+    async def _aquery(self, user_query: str, session_id: str, api_key: Optional[str], include_timings: bool):
+        timer = StageTimer()
+        async with self._get_inflight_semaphore():
+            timer.add("queue", time.perf_counter() - timer.started)
+            loop = asyncio.get_running_loop()
+            route_res, scheme_slug, official_links, history, session_api_key, vector = await loop.run_in_executor(
+                _get_retrieval_executor(), self._begin, user_query, session_id, api_key, timer
+            )
+            history_digest = self._history_digest(history)
+            cached = self._answer_from_facts(user_query, scheme_slug, official_links, timer)
+            answered_by = "facts"
+            if cached is None:
+                answered_by = "cache"
+                vector, cached, docs, context = await loop.run_in_executor(
+                    _get_retrieval_executor(), self._retrieve, user_query, scheme_slug, timer, history_digest, vector
+                )
+            if cached is not None:
+                result = await loop.run_in_executor(
+                    _get_retrieval_executor(), self._store_cached, session_id, user_query, route_res, scheme_slug, cached
+                )
+                return self._finish(result, timer, "aquery", answered_by, include_timings)
+            with timer.stage("prompt"):
+                prompt = self._build_prompt(user_query, history, context)
+            answer = await self._agenerate(prompt, session_api_key, timer, "aquery")
+            with timer.stage("store"):
+                result = await loop.run_in_executor(
+                    _get_retrieval_executor(), self._store, session_id, user_query, route_res, scheme_slug,
+                    official_links, docs, answer, vector, history_digest
+                )
+            return self._finish(result, timer, "aquery", "llm", include_timings)
+
+    async def astream(self, user_query: str, session_id: str = "default", api_key: Optional[str] = None,
+                      include_timings: bool = False, profile: bool = False):
+        """Stream a query as events: metadata first, then answer tokens, then done.
+        
+        Yields dicts of the form {"event": "metadata" | "token" | "done", ...}.
+        The completed answer is appended to the session history only once the
+        LLM stream finishes, so aborted streams leave the history untouched.
+        With `include_timings` the `done` event also carries stage timings.
+        """
+        with maybe_profile("astream", profile):
+            async for event in self._astream(user_query, session_id, api_key, include_timings):
+                yield event
+
+    async def _astream(self, user_query: str, session_id: str, api_key: Optional[str], include_timings: bool):
+        timer = StageTimer()
+        async with self._get_inflight_semaphore():
+            timer.add("queue", time.perf_counter() - timer.started)
+            loop = asyncio.get_running_loop()
+            route_res, scheme_slug, official_links, history, session_api_key, vector = await loop.run_in_executor(
+                _get_retrieval_executor(), self._begin, user_query, session_id, api_key, timer
+            )
+            history_digest = self._history_digest(history)
+            cached = self._answer_from_facts(user_query, scheme_slug, official_links, timer)
+            answered_by = "facts"
+            if cached is None:
+                answered_by = "cache"
+                vector, cached, docs, context = await loop.run_in_executor(
+                    _get_retrieval_executor(), self._retrieve, user_query, scheme_slug, timer, history_digest, vector
+                )
+            if cached is not None:
+                result = await loop.run_in_executor(
+                    _get_retrieval_executor(), self._store_cached, session_id, user_query, route_res, scheme_slug, cached
+                )
+                answer = result.pop("answer")
+                yield {"event": "metadata", **result}
+                yield {"event": "token", "content": answer}
+                done = self._finish({"answer": answer}, timer, "astream", answered_by, include_timings)
+                yield {"event": "done", **done}
+                return
+            yield {"event": "metadata", **self._response_metadata(route_res, scheme_slug, official_links, docs)}
+            
+            with timer.stage("prompt"):
+                prompt = self._build_prompt(user_query, history, context)
+            parts = []
+            info = {}
+            usage = {"prompt_tokens": 0, "completion_tokens": 0}
+            llm_started = time.perf_counter()
+            try:
+                async for chunk in GENERATOR.astream(prompt, session_api_key, info):
+                    chunk_usage = getattr(chunk, "usage_metadata", None)
+                    if chunk_usage:
+                        usage["prompt_tokens"] += chunk_usage.get("input_tokens", 0)
+                        usage["completion_tokens"] += chunk_usage.get("output_tokens", 0)
+                    if chunk.content:
+                        if not parts:
+                            timer.add("llm_first_token", time.perf_counter() - llm_started)
+                        parts.append(chunk.content)
+                        yield {"event": "token", "content": chunk.content}
+            except Exception:
+                self._record_failure("astream")
+                raise
+            timer.add("llm", time.perf_counter() - llm_started)
+            record_generation(info["model"], "fallback" if info["fallback"] else "primary", info["errors"], usage)
+            
+            answer = "".join(parts)
+            with timer.stage("store"):
+                await loop.run_in_executor(
+                    _get_retrieval_executor(), self._store, session_id, user_query, route_res, scheme_slug,
+                    official_links, docs, answer, vector, history_digest
+                )
+            done = self._finish({"answer": answer}, timer, "astream", "llm", include_timings)
+            yield {"event": "done", **done}
+
+    def _get_inflight_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores bind to the running loop on first use, so create lazily
+        if self._inflight is None:
+            self._inflight = asyncio.Semaphore(MAX_INFLIGHT_QUERIES)
+        return self._inflight
 
 if __name__ == "__main__":
     rag = Phase4RAG()
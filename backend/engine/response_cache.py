@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    q = re.sub(r"\s+", " ", query.strip().lower())
+    return q.rstrip("?.! ")
+
+
+class ResponseCache:
+    """Exact-match answer cache persisted in SQLite.
+
+    Keys combine the normalized query, the routed scheme and a digest of the
+    chat history that goes into the prompt. Each row records the index version
+    it was answered against; rows from any other version are never returned
+    and are purged on the next write, so a rebuild invalidates the cache for
+    every process sharing the file.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 86400.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._purged_version = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets several workers read while one writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    index_version TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+
+    @staticmethod
+    def make_key(query: str, scheme: str, history_digest: str) -> str:
+        raw = "\x1f".join([normalize_query(query), scheme or "", history_digest or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, scheme: str, history_digest: str, index_version: Optional[str]) -> Optional[dict]:
+        if index_version is None:
+            return None
+        row = self._conn().execute(
+            "SELECT payload, created_at FROM responses WHERE key = ? AND index_version = ?",
+            (self.make_key(query, scheme, history_digest), index_version),
+        ).fetchone()
+        hit = row is not None and time.time() - row[1] <= self.ttl_seconds
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if hit else None
+
+    def put(self, query: str, scheme: str, history_digest: str, index_version: Optional[str], payload: dict) -> None:
+        if index_version is None:
+            return
+        with self._conn() as conn:
+            if self._purged_version != index_version:
+                conn.execute("DELETE FROM responses WHERE index_version != ?", (index_version,))
+                self._purged_version = index_version
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, index_version, payload, created_at) VALUES (?, ?, ?, ?)",
+                (self.make_key(query, scheme, history_digest), index_version, json.dumps(payload), time.time()),
+            )
+
+    def clear(self) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        size = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        with self._stats_lock:
+            return {"size": size, "hits": self.hits, "misses": self.misses}
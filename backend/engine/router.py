@@ -1,10 +1,14 @@
+import json
 import os
-from typing import Optional
+import sys
+from typing import Optional, Dict, List
+import numpy as np
 from pydantic import BaseModel, Field
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(__file__))
+from llm_registry import get_llm
+
 # Load env
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../.env"))
 
@@ -13,6 +17,7 @@ class RouteResponse(BaseModel):
     classification: str = Field(description="Either 'scheme_specific' or 'general'")
     scheme: Optional[str] = Field(description="The HDFC fund scheme slug (hdfc_large_cap, hdfc_flexi_cap, hdfc_elss) or None")
     reasoning: str = Field(description="Brief reasoning for this classification")
+    confidence: Optional[float] = Field(default=None, description="Router confidence in [0, 1] (local router only)")
 
 # Router cache for performance optimization
 _ROUTER_CACHE = None
@@ -24,7 +29,8 @@ def get_router():
     if _ROUTER_CACHE is not None:
         return _ROUTER_CACHE
     
-    llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0)
+    from langchain_core.prompts import ChatPromptTemplate
+    llm = get_llm()
     
     # Using structured output capability of Llama 3 via LangChain
     structured_llm = llm.with_structured_output(RouteResponse)
@@ -53,6 +59,133 @@ def get_router():
     _ROUTER_CACHE = prompt | structured_llm
     return _ROUTER_CACHE
 
+# Labelled examples for the local router. "scheme_specific" covers fund
+# attribute questions that don't name a fund (follow-ups inherit the last one).
+ROUTER_EXAMPLES: Dict[str, List[str]] = {
+    "hdfc_large_cap": [
+        "What is the expense ratio of HDFC Large Cap Fund?",
+        "exit load for hdfc large cap",
+        "HDFC Top 100 fund NAV",
+        "Tell me about the HDFC bluechip fund",
+        "large cap fund investment objective",
+        "minimum SIP amount for HDFC Large Cap",
+        "Who manages the HDFC Top 100 Fund?",
+        "riskometer of hdfc large cap fund",
+    ],
+    "hdfc_flexi_cap": [
+        "What is the expense ratio of HDFC Flexi Cap Fund?",
+        "flexi cap fund TER?",
+        "exit load for hdfc flexicap",
+        "HDFC Flexi Cap NAV today",
+        "flexi cap fund AUM",
+        "investment strategy of HDFC Flexi Cap Fund",
+        "minimum sip in flexi cap",
+        "benchmark of the flexi cap fund",
+    ],
+    "hdfc_elss": [
+        "What is the lock-in period of HDFC ELSS Tax Saver?",
+        "HDFC TaxSaver fund NAV",
+        "elss tax saving fund expense ratio",
+        "Section 80C deduction with HDFC ELSS",
+        "exit load for hdfc tax saver",
+        "minimum investment in HDFC ELSS",
+        "HDFC tax saver fund performance",
+        "riskometer of the ELSS fund",
+    ],
+    "scheme_specific": [
+        "What is its NAV?",
+        "What about its exit load?",
+        "and the expense ratio?",
+        "What is the lock in period?",
+        "What is the minimum SIP amount?",
+        "What is the fund's AUM?",
+        "Who is the fund manager?",
+        "What is the benchmark index?",
+    ],
+    "general": [
+        "How to download capital gains statement?",
+        "How do I check my KYC status?",
+        "What is a mutual fund?",
+        "How can I get my account statement?",
+        "What is the difference between direct and regular plans?",
+        "How are mutual funds taxed?",
+        "How does SIP work?",
+        "How do I update my bank details?",
+        "What is the investor charter?",
+    ],
+}
+
+# Softmax temperature applied to cosine similarities when scoring labels
+ROUTER_SCALE = 20.0
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalRouter:
+    """Nearest-centroid query router over sentence embeddings (no API calls).
+    
+    Centroids are the mean normalized embeddings of ROUTER_EXAMPLES per label.
+    Routing a query is one small matrix-vector product on its embedding, so it
+    reuses the vector the RAG pipeline computes for retrieval anyway.
+    """
+    def __init__(self, labels: List[str], centroids: np.ndarray, model_name: Optional[str] = None):
+        self.labels = labels
+        self.centroids = _normalize_rows(np.asarray(centroids, dtype=np.float32))
+        self.model_name = model_name
+
+    @classmethod
+    def build(cls, embeddings, model_name: Optional[str] = None, examples: Dict[str, List[str]] = None) -> "LocalRouter":
+        examples = examples or ROUTER_EXAMPLES
+        labels = list(examples)
+        texts = [text for label in labels for text in examples[label]]
+        vectors = _normalize_rows(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+        centroids, offset = [], 0
+        for label in labels:
+            n = len(examples[label])
+            centroids.append(vectors[offset:offset + n].mean(axis=0))
+            offset += n
+        return cls(labels, np.stack(centroids), model_name)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({
+                "model_name": self.model_name,
+                "labels": self.labels,
+                "centroids": self.centroids.tolist(),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalRouter":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["labels"], np.asarray(data["centroids"]), data.get("model_name"))
+
+    def route(self, vector) -> RouteResponse:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        sims = self.centroids @ (vec / norm if norm else vec)
+        probs = np.exp((sims - sims.max()) * ROUTER_SCALE)
+        probs /= probs.sum()
+        best = int(np.argmax(probs))
+        label = self.labels[best]
+
+        if label == "general":
+            classification, scheme = "general", None
+        elif label == "scheme_specific":
+            classification, scheme = "scheme_specific", None
+        else:
+            classification, scheme = "scheme_specific", label
+        return RouteResponse(
+            classification=classification,
+            scheme=scheme,
+            reasoning=f"nearest centroid '{label}' (cosine {sims[best]:.2f})",
+            confidence=float(probs[best]),
+        )
+
 if __name__ == "__main__":
     router = get_router()
     test_queries = [
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed on query embedding, scoped to a routed scheme.
+
+    A lookup returns the stored result of the most similar previously answered
+    query in the same scheme if its cosine similarity is at least `threshold`.
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted once `max_entries` is exceeded. The whole cache is dropped when the
+    index version it was filled against changes.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()  # entry_id -> entry (LRU order)
+        self._matrices: Dict[str, tuple] = {}  # scheme -> (entry_ids, stacked vectors)
+        self._next_id = 0
+        self._index_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _check_version(self, index_version) -> None:
+        if index_version != self._index_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrices.clear()
+            self._index_version = index_version
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop(entry["scheme"], None)
+
+    def _scheme_matrix(self, scheme: str):
+        cached = self._matrices.get(scheme)
+        if cached is None:
+            ids = [eid for eid, e in self._entries.items() if e["scheme"] == scheme]
+            matrix = np.stack([self._entries[eid]["vector"] for eid in ids]) if ids else None
+            cached = (ids, matrix)
+            self._matrices[scheme] = cached
+        return cached
+
+    def lookup(self, scheme: str, vector, index_version=None) -> Optional[dict]:
+        """Return the cached result for the nearest query above threshold, or None."""
+        with self._lock:
+            self._check_version(index_version)
+            while True:
+                ids, matrix = self._scheme_matrix(scheme)
+                if matrix is None:
+                    self.misses += 1
+                    return None
+
+                sims = matrix @ self._normalize(vector)
+                best = int(np.argmax(sims))
+                entry_id = ids[best]
+                entry = self._entries[entry_id]
+
+                # Expired nearest neighbour: drop it and look again
+                if time.time() - entry["created_at"] > self.ttl_seconds:
+                    self._drop(entry_id)
+                    self.evictions += 1
+                    continue
+                if sims[best] < self.threshold:
+                    self.misses += 1
+                    return None
+
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return entry["result"]
+
+    def store(self, scheme: str, query: str, vector, result: dict, index_version=None) -> None:
+        with self._lock:
+            self._check_version(index_version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "scheme": scheme,
+                "query": query,
+                "vector": self._normalize(vector),
+                "result": result,
+                "created_at": time.time(),
+            }
+            self._matrices.pop(scheme, None)
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
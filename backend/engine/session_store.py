@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class SessionStore(ABC):
+    """Per-session conversation state with locking and bounded history.
+
+    State is a dict with `chat_history` (a deque holding the last
+    `history_turns` exchanges), `last_scheme` and `api_key`. Use
+    `locked(session_id)` for every read-modify-write so concurrent requests in
+    the same session do not interleave; keep the critical section short (do
+    not hold it across retrieval or the LLM call).
+    """
+
+    def __init__(self, history_turns: int = 3, ttl_seconds: float = 3600.0, max_sessions: int = 10000):
+        self.history_turns = history_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+
+    def new_state(self) -> dict:
+        return {
+            "chat_history": deque(maxlen=self.history_turns),
+            "last_scheme": "general",
+            "api_key": None
+        }
+
+    @abstractmethod
+    def locked(self, session_id: str):
+        """Context manager yielding the session's mutable state (created if needed)."""
+
+    def get(self, session_id: str) -> dict:
+        """Return a snapshot of the session state (creating it if needed)."""
+        with self.locked(session_id) as state:
+            return {**state, "chat_history": deque(state["chat_history"], maxlen=self.history_turns)}
+
+    @abstractmethod
+    def __contains__(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store with LRU eviction over `max_sessions` and idle TTL."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()  # session_id -> {state, lock, touched}
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Oldest entries sit at the front; stop at the first live one
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_sessions or now - entry["touched"] > self.ttl_seconds:
+                del self._entries[session_id]
+            else:
+                break
+
+    @contextmanager
+    def locked(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or now - entry["touched"] > self.ttl_seconds:
+                entry = {"state": self.new_state(), "lock": threading.Lock(), "touched": now}
+                self._entries[session_id] = entry
+            entry["touched"] = now
+            self._entries.move_to_end(session_id)
+            self._evict(now)
+        with entry["lock"]:
+            yield entry["state"]
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store shared by several worker processes through a local SQLite file.
+
+    Chat history and last scheme are persisted; API keys are never written to
+    disk and stay in the memory of the process that received them. Locking is
+    per process, so concurrent writes to one session from different workers
+    resolve as last-writer-wins.
+    """
+
+    SWEEP_INTERVAL = 60.0  # seconds between TTL / size sweeps
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        self._locals: "OrderedDict[str, dict]" = OrderedDict()  # session_id -> {lock, api_key}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _local_entry(self, session_id: str) -> dict:
+        with self._lock:
+            entry = self._locals.get(session_id)
+            if entry is None:
+                entry = {"lock": threading.Lock(), "api_key": None}
+                self._locals[session_id] = entry
+            self._locals.move_to_end(session_id)
+            while len(self._locals) > self.max_sessions:
+                self._locals.popitem(last=False)
+            return entry
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            """DELETE FROM sessions WHERE session_id IN (
+                SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_sessions,),
+        )
+
+    @contextmanager
+    def locked(self, session_id: str):
+        entry = self._local_entry(session_id)
+        with entry["lock"]:
+            now = time.time()
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT state, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            state = self.new_state()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                stored = json.loads(row[0])
+                state["chat_history"].extend(stored["chat_history"])
+                state["last_scheme"] = stored["last_scheme"]
+            state["api_key"] = entry["api_key"]
+
+            yield state
+
+            entry["api_key"] = state["api_key"]
+            persisted = {"chat_history": list(state["chat_history"]), "last_scheme": state["last_scheme"]}
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(persisted), now),
+                )
+                self._sweep(conn, now)
+
+    def __contains__(self, session_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(backend: str = "memory", path: str = None, **kwargs) -> SessionStore:
+    """Build the session store selected by `backend` ("memory" or "sqlite")."""
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, **kwargs)
+    if backend == "memory":
+        return InMemorySessionStore(**kwargs)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+    PlatformCollector, ProcessCollector, generate_latest,
+)
+
+# Own registry so /metrics only exposes what this module defines (plus process stats)
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in each query pipeline stage", ["stage"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+QUERIES = Counter(
+    "rag_queries", "Answered queries by entry point and what produced the answer",
+    ["path", "answered_by"], registry=REGISTRY,
+)
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups", "Answer cache lookups by cache and result", ["cache", "result"], registry=REGISTRY,
+)
+ROUTES = Counter(
+    "rag_routes", "Routed queries by classification and scheme", ["classification", "scheme"], registry=REGISTRY,
+)
+INHERITED_FOLLOWUPS = Counter(
+    "rag_inherited_followups", "Follow-up queries that inherited the session's last scheme", registry=REGISTRY,
+)
+LLM_REQUESTS = Counter(
+    "rag_llm_requests", "Completed LLM generations by model and outcome (primary, hedged, fallback)",
+    ["model", "outcome"], registry=REGISTRY,
+)
+LLM_ERRORS = Counter(
+    "rag_llm_errors", "Failed LLM attempts by kind (HTTP status, timeout, connection, failed)",
+    ["kind"], registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens", "LLM tokens by model and type (prompt, completion)", ["model", "type"], registry=REGISTRY,
+)
+STARTUP_SECONDS = Gauge(
+    "rag_startup_seconds", "Cold-start durations: import (to app startup), warmup, ready (to warm and serving)",
+    ["phase"], registry=REGISTRY,
+)
+
+
+class StageTimer:
+    """Per-request stage timings; every stage is also observed in STAGE_SECONDS."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds * 1000
+        STAGE_SECONDS.labels(name).observe(seconds)
+
+    def finish(self) -> Dict[str, float]:
+        """Record the total and return all timings in milliseconds."""
+        self.add("total", time.perf_counter() - self.started)
+        return {name: round(ms, 2) for name, ms in self.timings.items()}
+
+
+def record_generation(model: str, outcome: str, errors=(), usage: Optional[dict] = None) -> None:
+    LLM_REQUESTS.labels(model, outcome).inc()
+    for kind in errors:
+        LLM_ERRORS.labels(kind).inc()
+    if usage:
+        LLM_TOKENS.labels(model, "prompt").inc(usage.get("prompt_tokens") or 0)
+        LLM_TOKENS.labels(model, "completion").inc(usage.get("completion_tokens") or 0)
+
+
+def render_metrics():
+    """Prometheus text exposition: (body, content type)."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -3,19 +3,11 @@ const userInput = document.getElementById('user-input');
 const sendBtn = document.getElementById('send-btn');
 const exampleBtns = document.querySelectorAll('.example-btn');
 
-const API_URL = 'http://localhost:8000/chat';
+const STREAM_URL = 'http://localhost:8000/chat/stream';
 
 const chatContainer = document.querySelector('.chat-container');
 
-function appendMessage(text, role, officialLinks = []) {
-    // Hide welcome screen and adjust layout on first message
-    if (!chatContainer.classList.contains('active')) {
-        chatContainer.classList.add('active');
-    }
-
-    const messageDiv = document.createElement('div');
-    messageDiv.className = `message ${role}-message`;
-
+function renderMessage(messageDiv, text, role, officialLinks = []) {
     // Replace newlines with <br>
     let formattedText = text.replace(/\n/g, '<br>');
 
@@ -29,10 +21,49 @@ function appendMessage(text, role, officialLinks = []) {
     }
 
     messageDiv.innerHTML = formattedText;
-    chatBox.appendChild(messageDiv);
     chatBox.scrollTop = chatBox.scrollHeight;
 }
 
+function appendMessage(text, role, officialLinks = []) {
+    // Hide welcome screen and adjust layout on first message
+    if (!chatContainer.classList.contains('active')) {
+        chatContainer.classList.add('active');
+    }
+
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${role}-message`;
+    chatBox.appendChild(messageDiv);
+    renderMessage(messageDiv, text, role, officialLinks);
+    return messageDiv;
+}
+
+// Parse a Server-Sent Events stream from /chat/stream and dispatch each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let name = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) name = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            onEvent(name, data ? JSON.parse(data) : {});
+        }
+    }
+}
+
 async function handleSendMessage() {
     const query = userInput.value.trim();
     if (!query) return;
@@ -49,7 +80,7 @@ async function handleSendMessage() {
     chatBox.scrollTop = chatBox.scrollHeight;
 
     try {
-        const response = await fetch(API_URL, {
+        const response = await fetch(STREAM_URL, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -62,11 +93,31 @@ async function handleSendMessage() {
             throw new Error(errorData.detail || `Server Error (Status ${response.status})`);
         }
 
-        const data = await response.json();
-
-        // Remove loading and add assistant message
-        chatBox.removeChild(loadingDiv);
-        appendMessage(data.answer, 'assistant', data.official_links);
+        let messageDiv = null;
+        let answer = '';
+        let officialLinks = [];
+
+        await readEventStream(response, (name, data) => {
+            if (name === 'metadata') {
+                officialLinks = data.official_links || [];
+            } else if (name === 'token') {
+                // Replace loading indicator with the answer on the first token
+                if (!messageDiv) {
+                    chatBox.removeChild(loadingDiv);
+                    messageDiv = appendMessage('', 'assistant');
+                }
+                answer += data.content;
+                renderMessage(messageDiv, answer, 'assistant');
+            } else if (name === 'done') {
+                if (!messageDiv) {
+                    chatBox.removeChild(loadingDiv);
+                    messageDiv = appendMessage('', 'assistant');
+                }
+                renderMessage(messageDiv, data.answer, 'assistant', officialLinks);
+            } else if (name === 'error') {
+                throw new Error(data.detail || 'Streaming failed');
+            }
+        });
 
     } catch (error) {
         if (loadingDiv.parentNode) chatBox.removeChild(loadingDiv);
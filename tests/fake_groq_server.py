@@ -0,0 +1,207 @@
+"""Local Groq/OpenAI-compatible chat completions server with injectable faults.
+
+Point the app at it with GROQ_API_BASE=http://127.0.0.1:<port> (and any
+GROQ_API_KEY). Latency and errors can be set per model on the command line
+or at runtime with POST /_config, e.g.
+
+    python tests/fake_groq_server.py --port 8088 --latency-ms 400 \
+        --tail-rate 0.05 --tail-ms 4000 --error-rate 0.1 --error-status 429,503
+
+GET /_stats returns request/error counts per model.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FAULTS = {
+    "latency_ms": 200,     # median service time
+    "jitter_ms": 50,       # +/- uniform jitter
+    "tail_rate": 0.0,      # fraction of requests that are slow
+    "tail_ms": 3000,       # service time of a slow request
+    "error_rate": 0.0,     # fraction of requests that fail
+    "error_status": [429, 500, 503],
+    "token_delay_ms": 10,  # gap between streamed chunks
+}
+
+
+class FakeGroqState:
+    def __init__(self, faults=None, answer=None):
+        self.faults = {"*": dict(DEFAULT_FAULTS, **(faults or {}))}
+        self.answer = answer or "According to the scheme documents, this is a fake answer from {model}."
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def configure(self, model="*", **faults):
+        with self.lock:
+            base = self.faults.get(model, self.faults["*"])
+            self.faults[model] = dict(base, **faults)
+
+    def reset(self):
+        with self.lock:
+            self.faults = {"*": self.faults["*"]}
+            self.stats = {}
+
+    def faults_for(self, model):
+        with self.lock:
+            return dict(self.faults.get(model, self.faults["*"]))
+
+    def count(self, model, key):
+        with self.lock:
+            per_model = self.stats.setdefault(model, {"requests": 0, "errors": 0})
+            per_model[key] += 1
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self) -> FakeGroqState:
+        return self.server.state
+
+    def _json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            with self.state.lock:
+                self._json(200, self.state.stats)
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path == "/_config":
+            body = self._read_body()
+            if body.pop("reset", False):
+                self.state.reset()
+            model = body.pop("model", "*")
+            if body:
+                self.state.configure(model, **body)
+            return self._json(200, self.state.faults)
+        if not self.path.endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+
+        request = self._read_body()
+        model = request.get("model", "unknown")
+        faults = self.state.faults_for(model)
+        self.state.count(model, "requests")
+
+        if random.random() < faults["tail_rate"]:
+            delay = faults["tail_ms"]
+        else:
+            delay = faults["latency_ms"] + random.uniform(-faults["jitter_ms"], faults["jitter_ms"])
+        time.sleep(max(delay, 0) / 1000)
+
+        if random.random() < faults["error_rate"]:
+            status = random.choice(faults["error_status"])
+            self.state.count(model, "errors")
+            headers = {"Retry-After": "0"} if status == 429 else None
+            return self._json(status, {"error": {"message": f"injected {status}", "type": "fake_error"}}, headers)
+
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        text = self.state.answer.format(model=model)
+        usage = {
+            "prompt_tokens": len(prompt) // 4 + 1,
+            "completion_tokens": len(text) // 4 + 1,
+            "total_tokens": len(prompt) // 4 + len(text) // 4 + 2,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not request.get("stream"):
+            return self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(faults["token_delay_ms"] / 1000)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": usage},
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def start_server(host="127.0.0.1", port=0, **faults):
+    """Start the fake server on a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), FakeGroqHandler)
+    server.daemon_threads = True
+    server.state = FakeGroqState(faults)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_FAULTS["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_FAULTS["jitter_ms"])
+    parser.add_argument("--tail-rate", type=float, default=DEFAULT_FAULTS["tail_rate"])
+    parser.add_argument("--tail-ms", type=float, default=DEFAULT_FAULTS["tail_ms"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_FAULTS["error_rate"])
+    parser.add_argument("--error-status", default="429,500,503")
+    args = parser.parse_args()
+
+    server, url = start_server(
+        args.host, args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms,
+        error_rate=args.error_rate,
+        error_status=[int(s) for s in args.error_status.split(",") if s],
+    )
+    print(f"Fake Groq server listening on {url} (set GROQ_API_BASE={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
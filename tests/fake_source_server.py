@@ -0,0 +1,157 @@
+"""Local stand-in for the document hosts ingestion fetches from.
+
+Serves in-memory documents with ETag / Last-Modified validators and answers
+conditional GETs with 304, so the fetcher can be exercised offline:
+
+    server, base_url = start_server(latency_ms=50)
+    server.state.put("/kim.pdf", b"%PDF-1.4 ...")
+    # fetch f"{base_url}/kim.pdf"; server.state.stats has counts per status
+
+Faults: `latency_ms` delays every response, `error_status` fails a path with
+that status, `truncate` sends a Content-Length larger than the body and
+drops the connection mid-download.
+"""
+import argparse
+import email.utils
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+
+class FakeSourceState:
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.documents = {}  # path -> {body, content_type, etag, last_modified, faults}
+        self.stats = {}
+        self.active = 0
+        self.max_active = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+
+    def put(self, path, body, content_type="application/pdf", last_modified=None, **faults):
+        """Add or replace a document; a new body gets a new ETag and Last-Modified."""
+        with self.lock:
+            self.documents[path] = {
+                "body": body,
+                "content_type": content_type,
+                "etag": '"%s"' % hashlib.sha1(body).hexdigest()[:16],
+                "last_modified": email.utils.formatdate(last_modified or time.time(), usegmt=True),
+                "faults": faults,
+            }
+
+    def configure(self, path, **faults):
+        with self.lock:
+            self.documents[path]["faults"] = dict(self.documents[path]["faults"], **faults)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            self.max_active = 0
+            self.connections = set()
+            for doc in self.documents.values():
+                doc["faults"] = {}
+
+    def count(self, status):
+        with self.lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+
+class FakeSourceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self) -> FakeSourceState:
+        return self.server.state
+
+    def _send(self, status, headers=None, body=b""):
+        self.state.count(status)
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.state
+        with state.lock:
+            state.active += 1
+            state.max_active = max(state.max_active, state.active)
+            state.connections.add(self.client_address)
+            doc = state.documents.get(self.path.split("?", 1)[0])
+            doc = dict(doc) if doc else None
+        try:
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+            if doc is None:
+                return self._send(404)
+            faults = doc["faults"]
+            if faults.get("error_status"):
+                return self._send(faults["error_status"])
+
+            validators = {"ETag": doc["etag"], "Last-Modified": doc["last_modified"]}
+            if_none_match = self.headers.get("If-None-Match")
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_none_match is not None:
+                not_modified = doc["etag"] in [tag.strip() for tag in if_none_match.split(",")]
+            elif if_modified_since is not None:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+                not_modified = email.utils.parsedate_to_datetime(doc["last_modified"]) <= since
+            else:
+                not_modified = False
+            if not_modified:
+                return self._send(304, validators)
+
+            headers = dict(validators, **{"Content-Type": doc["content_type"]})
+            body = doc["body"]
+            if faults.get("truncate"):
+                headers["Content-Length"] = str(len(body))
+                headers["Connection"] = "close"
+                self._send(200, headers, body[: len(body) // 2])
+                self.close_connection = True
+                return
+            self._send(200, headers, body)
+        finally:
+            with state.lock:
+                state.active -= 1
+
+
+def start_server(host="127.0.0.1", port=0, latency_ms=0.0):
+    """Start the fake server on a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), FakeSourceHandler)
+    server.daemon_threads = True
+    server.state = FakeSourceState(latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("files", nargs="*", help="Local files to serve under /<basename>")
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, args.latency_ms)
+    for path in args.files:
+        with open(path, "rb") as f:
+            name = path.rsplit("/", 1)[-1]
+            server.state.put("/" + quote(name), f.read(), "application/pdf" if name.endswith(".pdf") else "text/html")
+            print(f"Serving {url}/{quote(name)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Replay a question corpus against the chat API at a fixed concurrency.
+
+By default this starts tests/fake_groq_server.py in-process and the FastAPI
+app under uvicorn pointed at it (GROQ_API_BASE), so runs need no Groq key or
+network. Pass --url to load an already running API instead.
+
+Stages reported (milliseconds):
+  total        request start to complete response
+  retrieval    request start to the `metadata` event (stream endpoint only)
+  first_token  request start to the first `token` event (stream endpoint only)
+  server.*     server-side pipeline stages returned with `include_timings`
+
+Results are written as JSON (see --output) and can be diffed against an
+earlier run with --compare.
+
+    python tests/load_test.py --concurrency 16 --requests 400 --llm-latency-ms 800
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+sys.path.append(os.path.dirname(__file__))
+from fake_groq_server import start_server
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_CORPUS = os.path.join(PROJECT_ROOT, "sample_qa.md")
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, ".cache", "loadtest")
+QUESTION_RE = re.compile(r"^\s*\d+\.\s+(.+?)\s*$")
+
+
+def load_corpus(paths):
+    """Questions from numbered markdown lists (sample_qa.md) or query logs.
+
+    A query log is either JSONL with a `message` (and optional `session_id`)
+    per line, or plain text with one question per line.
+    """
+    queries = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f]
+        if path.endswith(".md"):
+            queries.extend({"message": m.group(1)} for m in map(QUESTION_RE.match, lines) if m)
+            continue
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                queries.append({"message": record["message"], "session_id": record.get("session_id")})
+            else:
+                queries.append({"message": line})
+    return queries
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = q * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_stage(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else None,
+    }
+
+
+def server_timings(timings):
+    return {f"server.{stage}": ms for stage, ms in (timings or {}).items()}
+
+
+async def send_chat(client, query, session_id):
+    started = time.perf_counter()
+    response = await client.post(
+        "/chat", json={"message": query["message"], "session_id": session_id, "include_timings": True}
+    )
+    timings = {"total": (time.perf_counter() - started) * 1000}
+    if response.status_code == 200:
+        timings.update(server_timings(response.json().get("timings")))
+    return response.status_code, timings, response.status_code == 200
+
+
+async def send_stream(client, query, session_id):
+    started = time.perf_counter()
+    timings = {}
+    ok = False
+    payload = {"message": query["message"], "session_id": session_id, "include_timings": True}
+    async with client.stream("POST", "/chat/stream", json=payload) as response:
+        if response.status_code == 200:
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if event == "metadata":
+                        timings.setdefault("retrieval", elapsed)
+                    elif event == "token":
+                        timings.setdefault("first_token", elapsed)
+                    elif event == "done":
+                        ok = True
+                    elif event == "error":
+                        ok = False
+                elif line.startswith("data: ") and event == "done":
+                    timings.update(server_timings(json.loads(line[len("data: "):]).get("timings")))
+        else:
+            await response.aread()
+    timings["total"] = (time.perf_counter() - started) * 1000
+    return response.status_code, timings, ok
+
+
+async def run_load(base_url, queries, concurrency, total_requests, endpoint, timeout):
+    send = send_stream if endpoint == "stream" else send_chat
+    samples = []
+    next_index = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            nonlocal next_index
+            while next_index < total_requests:
+                i = next_index
+                next_index += 1
+                query = queries[i % len(queries)]
+                session_id = query.get("session_id") or f"load-{uuid.uuid4().hex[:12]}"
+                try:
+                    status, timings, ok = await send(client, query, session_id)
+                    samples.append({"status": status, "ok": ok, "timings": timings})
+                except httpx.HTTPError as e:
+                    samples.append({"status": type(e).__name__, "ok": False, "timings": {}})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return samples, elapsed
+
+
+def build_report(samples, elapsed, config, llm_stats):
+    ok_samples = [s for s in samples if s["ok"]]
+    stages = {}
+    for sample in ok_samples:
+        for stage, value in sample["timings"].items():
+            stages.setdefault(stage, []).append(value)
+    status_counts = {}
+    for sample in samples:
+        status_counts[str(sample["status"])] = status_counts.get(str(sample["status"]), 0) + 1
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok_samples),
+        "error_rate": (len(samples) - len(ok_samples)) / len(samples) if samples else 0.0,
+        "duration_s": elapsed,
+        "throughput_rps": len(ok_samples) / elapsed if elapsed else 0.0,
+        "status_counts": status_counts,
+        "stages_ms": {stage: summarize_stage(values) for stage, values in stages.items()},
+        "llm_server": llm_stats,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\nRequests: {report['requests']}  errors: {report['errors']} ({report['error_rate']:.1%})  "
+          f"throughput: {report['throughput_rps']:.2f} req/s  status: {report['status_counts']}")
+    print(f"{'stage':<24} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for stage, s in report["stages_ms"].items():
+        line = f"{stage:<24} {s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f} {s['max']:>9.1f}"
+        base = (baseline or {}).get("stages_ms", {}).get(stage)
+        if base and base.get("p95"):
+            line += f"   p95 vs baseline: {(s['p95'] - base['p95']) / base['p95']:+.1%}"
+        print(line)
+    if baseline:
+        print(f"throughput vs baseline: {report['throughput_rps'] - baseline['throughput_rps']:+.2f} req/s, "
+              f"error rate vs baseline: {report['error_rate'] - baseline['error_rate']:+.1%}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(port, env, startup_timeout):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with code {proc.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1.0)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("API did not start in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running API (default: start one against the fake LLM)")
+    parser.add_argument("--corpus", nargs="+", default=[DEFAULT_CORPUS], help="sample_qa.md and/or query log files")
+    parser.add_argument("--endpoint", choices=["chat", "stream"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5, help="Requests sent (and discarded) before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--no-cache", action="store_true", help="Disable answer caches and fact answers in the spawned API")
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0)
+    parser.add_argument("--llm-tail-ms", type=float, default=5000)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Result JSON path (default: .cache/loadtest/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    if not queries:
+        sys.exit("No questions found in corpus")
+
+    fake_server, api_proc = None, None
+    base_url = args.url
+    if base_url is None:
+        fake_server, llm_url = start_server(
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            tail_rate=args.llm_tail_rate,
+            tail_ms=args.llm_tail_ms,
+            error_rate=args.llm_error_rate,
+        )
+        env = dict(os.environ, GROQ_API_BASE=llm_url, GROQ_API_KEY=os.getenv("GROQ_API_KEY", "fake-key"))
+        if args.no_cache:
+            env.update(RAG_RESPONSE_CACHE="0", RAG_SEMANTIC_CACHE="0", RAG_FACT_ANSWERS="0")
+        port = free_port()
+        print(f"Starting API on port {port} against fake LLM at {llm_url} ...")
+        api_proc = start_api(port, env, args.timeout)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        if args.warmup:
+            asyncio.run(run_load(base_url, queries, 1, args.warmup, args.endpoint, args.timeout))
+        if fake_server is not None:
+            fake_server.state.reset()
+        print(f"Replaying {args.requests} requests from {len(queries)} questions at concurrency {args.concurrency} ...")
+        samples, elapsed = asyncio.run(
+            run_load(base_url, queries, args.concurrency, args.requests, args.endpoint, args.timeout)
+        )
+    finally:
+        if api_proc is not None:
+            api_proc.terminate()
+            api_proc.wait()
+
+    config = {
+        "url": args.url or "spawned",
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "corpus": [os.path.basename(p) for p in args.corpus],
+        "questions": len(queries),
+        "no_cache": args.no_cache,
+        "fake_llm": None if args.url else {
+            "latency_ms": args.llm_latency_ms,
+            "jitter_ms": args.llm_jitter_ms,
+            "tail_rate": args.llm_tail_rate,
+            "tail_ms": args.llm_tail_ms,
+            "error_rate": args.llm_error_rate,
+        },
+    }
+    report = build_report(samples, elapsed, config, fake_server.state.stats if fake_server else None)
+    if fake_server is not None:
+        fake_server.shutdown()
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Offline retrieval benchmark: recall@k, MRR and search latency.
+
+Runs entirely locally, with no LLM and no network, provided the embedding
+model is already in the HuggingFace cache. The corpus is built from:
+  - PDFs already in downloaded_sources/, parsed with ingest's own
+    parse_pdf and source_metadata;
+  - live web pages recovered from vector_db/lexical_index.json, if present.
+
+For every chunk size/overlap, the pages are re-split and embedded once.
+Each HNSW setting is then indexed into an in-memory Chroma collection.
+Every (scheme filter, retrieval mode, k) combination is scored against the
+labelled questions in tests/retrieval_benchmark.jsonl. A retrieved chunk is
+relevant when its source contains one of the item's `sources` substrings,
+and also matches the item's optional `page` and `text`.
+
+    python tests/retrieval_benchmark.py --k 5 10 20 --chunks 1000:200 800:100 \
+        --hnsw default M=32,construction_ef=200,search_ef=50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import unquote
+
+import chromadb
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Add project root to path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+from backend.data.ingest import (
+    CHUNK_OVERLAP, CHUNK_SIZE, EMBEDDING_MODEL_NAME, LEXICAL_INDEX_FILE,
+    is_pdf_url, load_sources_from_csv, local_pdf_path, source_metadata,
+)
+from backend.data.pdf_parse import parse_pdf
+from backend.engine.lexical_index import BM25Index, reciprocal_rank_fusion
+from backend.engine.embedding_backends import EMBEDDING_BACKEND, create_embeddings
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(__file__), "retrieval_benchmark.jsonl")
+DEFAULT_OUTPUT = os.path.join(PROJECT_ROOT, ".cache", "retrieval_benchmark.json")
+ADD_BATCH_SIZE = 1000
+
+
+def load_pages():
+    """Source pages with the same metadata ingest_docs attaches."""
+    pages = []
+    for source in load_sources_from_csv():
+        url = source["url"]
+        if not is_pdf_url(url):
+            continue
+        path = local_pdf_path(url)
+        if not os.path.exists(path):
+            print(f"  - skipping (not downloaded): {source['description']}")
+            continue
+        pages.extend(parse_pdf(path, url, source_metadata(source)))
+
+    # Live pages can't be scraped offline; rebuild them from the last index
+    if os.path.exists(LEXICAL_INDEX_FILE):
+        with open(LEXICAL_INDEX_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        chunks_by_source = {}
+        for text, meta in zip(data["texts"], data["metadatas"]):
+            if meta.get("is_live") and meta.get("start_index") is not None:
+                chunks_by_source.setdefault(meta["source"], []).append((meta["start_index"], text, meta))
+        for chunks in chunks_by_source.values():
+            chunks.sort(key=lambda c: c[0])
+            text = ""
+            for start, chunk, _ in chunks:
+                text += chunk[max(len(text) - start, 0):]
+            meta = {k: v for k, v in chunks[0][2].items() if k != "start_index"}
+            pages.append(Document(page_content=text, metadata=meta))
+    return pages
+
+
+def load_labels(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_relevant(meta, text, item):
+    source = unquote(meta.get("source", ""))
+    if not any(s in source for s in item["sources"]):
+        return False
+    if item.get("page") is not None and meta.get("page") != item["page"]:
+        return False
+    return item.get("text") is None or item["text"].lower() in text.lower()
+
+
+def score(ranked, item, k):
+    """(hit, reciprocal rank) for the top-k (meta, text) pairs."""
+    for rank, (meta, text) in enumerate(ranked[:k], 1):
+        if is_relevant(meta, text, item):
+            return 1.0, 1.0 / rank
+    return 0.0, 0.0
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_hnsw(spec):
+    """'M=32,construction_ef=200,search_ef=50' -> Chroma collection metadata."""
+    if spec == "default":
+        return {}
+    metadata = {}
+    for part in spec.split(","):
+        key, value = part.split("=")
+        metadata[f"hnsw:{key.strip()}"] = int(value)
+    return metadata
+
+
+def build_collection(client, name, chunks, vectors, hnsw, space):
+    collection = client.create_collection(name, metadata={"hnsw:space": space, **parse_hnsw(hnsw)})
+    for start in range(0, len(chunks), ADD_BATCH_SIZE):
+        batch = chunks[start:start + ADD_BATCH_SIZE]
+        collection.add(
+            ids=[str(i) for i in range(start, start + len(batch))],
+            embeddings=vectors[start:start + len(batch)].tolist(),
+            documents=[c.page_content for c in batch],
+            metadatas=[{k: v for k, v in c.metadata.items() if v is not None} for c in batch],
+        )
+    return collection
+
+
+def exact_top_k(vectors, query, k, mask, space):
+    if space == "cosine":
+        scores = -(vectors @ query) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12)
+    elif space == "ip":
+        scores = -(vectors @ query)
+    else:
+        scores = ((vectors - query) ** 2).sum(axis=1)
+    scores = np.where(mask, scores, np.inf)
+    top = np.argsort(scores)[:k]
+    return {int(i) for i in top if mask[i]}
+
+
+def run_benchmark(args):
+    items = load_labels(args.labels)
+    print("Loading source pages ...")
+    pages = load_pages()
+    if not pages:
+        sys.exit("No local pages found; run ingestion once so downloaded_sources/ is populated.")
+    print(f"✓ {len(pages)} pages")
+
+    embeddings = create_embeddings()
+    start = time.perf_counter()
+    query_vectors = np.asarray(embeddings.embed_documents([item["question"] for item in items]), dtype=np.float32)
+    query_embed_ms = (time.perf_counter() - start) * 1000 / len(items)
+
+    client = chromadb.EphemeralClient()
+    max_k = max(args.k)
+    rows = []
+    runs = []
+
+    for chunk_spec in args.chunks:
+        chunk_size, chunk_overlap = (int(x) for x in chunk_spec.split(":"))
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+        chunks = splitter.split_documents(pages)
+        start = time.perf_counter()
+        vectors = np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+        embed_s = time.perf_counter() - start
+        schemes = np.array([c.metadata.get("scheme") for c in chunks])
+
+        # Questions whose expected sources aren't in the local corpus can't be scored
+        present = [
+            item for item in items
+            if any(is_relevant(c.metadata, c.page_content, item) for c in chunks)
+        ]
+        skipped = [item["question"] for item in items if item not in present]
+        item_index = {id(item): i for i, item in enumerate(items)}
+        lexical = BM25Index.build(chunks)
+        print(f"\nchunks {chunk_size}:{chunk_overlap} -> {len(chunks)} chunks, embedded in {embed_s:.1f}s, "
+              f"{len(present)}/{len(items)} questions scorable")
+        runs.append({
+            "chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "chunks": len(chunks),
+            "embed_s": embed_s, "skipped_questions": skipped,
+        })
+
+        for hnsw in args.hnsw:
+            name = f"bench-{chunk_size}-{chunk_overlap}-{len(rows)}"
+            start = time.perf_counter()
+            collection = build_collection(client, name, chunks, vectors, hnsw, args.space)
+            index_s = time.perf_counter() - start
+
+            for filtered in args.filter:
+                for k in args.k:
+                    stats = {mode: {"hits": [], "rr": [], "latency": [], "overlap": []} for mode in args.modes}
+                    for item in present:
+                        qv = query_vectors[item_index[id(item)]]
+                        scheme = item["scheme"] if filtered == "on" and item["scheme"] != "general" else None
+
+                        start = time.perf_counter()
+                        res = collection.query(
+                            query_embeddings=[qv.tolist()], n_results=k,
+                            where={"scheme": scheme} if scheme else None,
+                            include=["metadatas", "documents"],
+                        )
+                        vector_ms = (time.perf_counter() - start) * 1000
+                        ids = [int(i) for i in res["ids"][0]]
+
+                        if "vector" in stats:
+                            ranked = [(chunks[i].metadata, chunks[i].page_content) for i in ids]
+                            hit, rr = score(ranked, item, k)
+                            mask = schemes == scheme if scheme else np.ones(len(chunks), dtype=bool)
+                            exact = exact_top_k(vectors, qv, k, mask, args.space)
+                            s = stats["vector"]
+                            s["hits"].append(hit)
+                            s["rr"].append(rr)
+                            s["latency"].append(vector_ms)
+                            s["overlap"].append(len(exact & set(ids)) / max(len(exact), 1))
+
+                        if "hybrid" in stats:
+                            start = time.perf_counter()
+                            lexical_docs = [chunks[i] for i, _ in lexical.search(item["question"], k=k, scheme=scheme)]
+                            fused = reciprocal_rank_fusion([[chunks[i] for i in ids], lexical_docs], limit=k)
+                            hybrid_ms = vector_ms + (time.perf_counter() - start) * 1000
+                            hit, rr = score([(d.metadata, d.page_content) for d in fused], item, k)
+                            s = stats["hybrid"]
+                            s["hits"].append(hit)
+                            s["rr"].append(rr)
+                            s["latency"].append(hybrid_ms)
+
+                    for mode, s in stats.items():
+                        if not s["hits"]:
+                            continue
+                        rows.append({
+                            "chunk_size": chunk_size,
+                            "chunk_overlap": chunk_overlap,
+                            "hnsw": hnsw,
+                            "index_build_s": index_s,
+                            "filter": filtered,
+                            "mode": mode,
+                            "k": k,
+                            "questions": len(s["hits"]),
+                            "recall": sum(s["hits"]) / len(s["hits"]),
+                            "mrr": sum(s["rr"]) / len(s["rr"]),
+                            "ann_overlap": sum(s["overlap"]) / len(s["overlap"]) if s["overlap"] else None,
+                            "latency_p50_ms": percentile(s["latency"], 0.50),
+                            "latency_p95_ms": percentile(s["latency"], 0.95),
+                        })
+            client.delete_collection(name)
+
+    return {
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "space": args.space,
+        "labels": os.path.basename(args.labels),
+        "query_embed_ms": query_embed_ms,
+        "runs": runs,
+        "results": rows,
+    }
+
+
+def print_results(report):
+    print(f"\n{'chunks':<10} {'hnsw':<32} {'filter':<6} {'mode':<7} {'k':>3} "
+          f"{'recall':>7} {'mrr':>6} {'ann':>5} {'p50ms':>7} {'p95ms':>7}")
+    for r in report["results"]:
+        ann = f"{r['ann_overlap']:.2f}" if r["ann_overlap"] is not None else "-"
+        print(f"{r['chunk_size']}:{r['chunk_overlap']:<5} {r['hnsw']:<32} {r['filter']:<6} {r['mode']:<7} {r['k']:>3} "
+              f"{r['recall']:>7.2f} {r['mrr']:>6.2f} {ann:>5} {r['latency_p50_ms']:>7.2f} {r['latency_p95_ms']:>7.2f}")
+    print(f"\nQuery embedding: {report['query_embed_ms']:.1f} ms/question")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 10, 20])
+    parser.add_argument("--chunks", nargs="+", default=[f"{CHUNK_SIZE}:{CHUNK_OVERLAP}"], help="chunk_size:overlap pairs")
+    parser.add_argument("--hnsw", nargs="+", default=["default"], help="'default' or e.g. M=32,construction_ef=200,search_ef=50")
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2", help="Distance (the app's collection uses l2)")
+    parser.add_argument("--filter", nargs="+", choices=["on", "off"], default=["on", "off"], help="Apply the scheme metadata filter")
+    parser.add_argument("--modes", nargs="+", choices=["vector", "hybrid"], default=["vector", "hybrid"])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_results(report)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
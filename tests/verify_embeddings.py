@@ -0,0 +1,137 @@
+"""Check the ONNX embedding backend against sentence-transformers and compare their cost.
+
+    python -m backend.engine.embedding_backends export
+    python tests/verify_embeddings.py [--tolerance 0.99] [--chunks 300]
+
+Vectors are compared on the benchmark questions plus a sample of ingested
+chunks (vector_db/lexical_index.json, if present); top-5 chunk rankings per
+question must agree too. Load time, query latency and peak RSS are measured
+for each backend in its own subprocess so one model doesn't inflate the
+other's memory.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.engine.embedding_backends import compare_embeddings, create_embeddings
+
+BENCHMARK_FILE = os.path.join(os.path.dirname(__file__), "retrieval_benchmark.jsonl")
+LEXICAL_INDEX_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "../vector_db/lexical_index.json"))
+TOP_K = 5
+
+
+def load_questions():
+    with open(BENCHMARK_FILE, encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def load_chunks(max_chunks):
+    """An evenly spaced sample of the ingested chunks, or [] before ingestion."""
+    if not os.path.exists(LEXICAL_INDEX_FILE):
+        return []
+    with open(LEXICAL_INDEX_FILE, encoding="utf-8") as f:
+        texts = json.load(f)["texts"]
+    if not max_chunks:
+        return texts
+    return texts[::max(1, len(texts) // max_chunks)][:max_chunks]
+
+
+def top_k(query_vectors, chunk_vectors, k=TOP_K):
+    import numpy as np
+    scores = np.asarray(query_vectors) @ np.asarray(chunk_vectors).T
+    return [list(row) for row in np.argsort(-scores, axis=1)[:, :k]]
+
+
+def measure(backend, questions):
+    """Runs in a subprocess: cost of loading one backend and embedding queries."""
+    started = time.perf_counter()
+    embeddings = create_embeddings(backend)
+    embeddings.embed_query("warm up")
+    load_s = time.perf_counter() - started
+    latencies = []
+    for question in questions * 5:
+        started = time.perf_counter()
+        embeddings.embed_query(question)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    started = time.perf_counter()
+    embeddings.embed_documents(questions * 10)
+    batch_s = time.perf_counter() - started
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1e6 if sys.platform == "darwin" else peak / 1024
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "query_p50_ms": latencies[len(latencies) // 2],
+        "query_p95_ms": latencies[int(len(latencies) * 0.95)],
+        "docs_per_s": len(questions) * 10 / batch_s,
+        "peak_rss_mb": peak_mb,
+    }
+
+
+def measure_in_subprocess(backend):
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", backend], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check(name, ok, detail=""):
+    print(f"CHECK: {name} -> {'PASSED' if ok else 'FAILED'} {detail}")
+
+
+def test_embeddings(tolerance, max_chunks):
+    print("--- Embedding Backend Test (torch vs int8 ONNX) ---")
+    questions, chunks = load_questions(), load_chunks(max_chunks)
+    print(f"{len(questions)} questions, {len(chunks)} chunks")
+
+    reference = create_embeddings("torch")
+    candidate = create_embeddings("onnx")
+    print(f"ONNX export: {json.dumps(candidate.meta)}")
+
+    result = compare_embeddings(reference, candidate, questions + chunks)
+    check(f"Vectors agree (min cosine >= {tolerance})", result["min_cosine"] >= tolerance,
+          f"(min {result['min_cosine']:.4f}, mean {result['mean_cosine']:.4f}; worst: {result['worst_text'][:60]!r})")
+
+    if chunks:
+        expected = top_k(reference.embed_documents(questions), reference.embed_documents(chunks))
+        actual = top_k(candidate.embed_documents(questions), candidate.embed_documents(chunks))
+        overlap = sum(len(set(a) & set(e)) for a, e in zip(actual, expected)) / (TOP_K * len(questions))
+        same_first = sum(a[0] == e[0] for a, e in zip(actual, expected)) / len(questions)
+        check(f"Top-{TOP_K} retrieval agrees", overlap >= 0.9, f"(overlap {overlap:.0%}, same top-1 {same_first:.0%})")
+    else:
+        print(f"(no {LEXICAL_INDEX_FILE}; run ingestion to compare rankings)")
+
+    single = candidate.embed_query(questions[0])
+    batched = candidate.embed_documents([questions[0], "a much longer text " * 20])[0]
+    check("Padding doesn't change vectors", max(abs(a - b) for a, b in zip(single, batched)) < 1e-4)
+
+    rows = [measure_in_subprocess(backend) for backend in ("torch", "onnx")]
+    print(f"\n{'backend':<8} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'docs/s':>8} {'peak MB':>8}")
+    for row in rows:
+        print(f"{row['backend']:<8} {row['load_s']:>7.2f} {row['query_p50_ms']:>7.2f} {row['query_p95_ms']:>7.2f} "
+              f"{row['docs_per_s']:>8.1f} {row['peak_rss_mb']:>8.0f}")
+    torch_row, onnx_row = rows
+    check("ONNX uses less memory", onnx_row["peak_rss_mb"] < torch_row["peak_rss_mb"])
+    check("ONNX queries are faster", onnx_row["query_p50_ms"] < torch_row["query_p50_ms"])
+
+    print("\n--- EMBEDDING TEST COMPLETE ---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the torch and ONNX embedding backends.")
+    parser.add_argument("--tolerance", type=float, default=0.99, help="Minimum cosine similarity per text")
+    parser.add_argument("--chunks", type=int, default=300, help="Ingested chunks to sample (0 = all)")
+    parser.add_argument("--measure", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, load_questions())))
+    else:
+        test_embeddings(args.tolerance, args.chunks)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from fake_source_server import start_server
+from backend.data.fetcher import SourceFetcher
+
+SERVER, BASE_URL = start_server(latency_ms=100)
+DOCS = [f"/doc-{i}.pdf" for i in range(6)]
+URLS = [BASE_URL + path for path in DOCS]
+
+
+def make_fetcher(workdir, workers=4):
+    download_dir = os.path.join(workdir, "downloads")
+    return SourceFetcher(
+        lambda url: os.path.join(download_dir, url.rsplit("/", 1)[-1]),
+        os.path.join(workdir, "state.json"),
+        workers=workers,
+        timeout=5.0,
+    )
+
+
+def statuses(results):
+    return sorted(r.status for r in results.values())
+
+
+def leftovers(workdir):
+    download_dir = os.path.join(workdir, "downloads")
+    return [name for name in os.listdir(download_dir) if name.endswith(".part")] if os.path.isdir(download_dir) else []
+
+
+def check(name, ok, detail=""):
+    print(f"CHECK: {name} -> {'PASSED' if ok else 'FAILED'} {detail}")
+
+
+def test_fetcher():
+    print("--- Source Fetcher Test (fake document host) ---")
+    workdir = tempfile.mkdtemp(prefix="fetcher-")
+    try:
+        for i, path in enumerate(DOCS):
+            SERVER.state.put(path, b"%PDF-1.4 " + bytes([65 + i]) * 50_000, last_modified=time.time() - 3600)
+
+        started = time.perf_counter()
+        results = make_fetcher(workdir).fetch_all(URLS)
+        elapsed = time.perf_counter() - started
+        intact = all(open(r.path, "rb").read() == SERVER.state.documents[p]["body"] for p, r in zip(DOCS, results.values()))
+        check("First fetch downloads everything", statuses(results) == ["downloaded"] * len(DOCS) and intact)
+        check("Downloads run concurrently", SERVER.state.max_active > 1 and elapsed < 0.1 * len(DOCS),
+              f"(max {SERVER.state.max_active} in flight, {elapsed:.2f}s)")
+        check("Connections are pooled", len(SERVER.state.connections) <= 4, f"({len(SERVER.state.connections)} connections)")
+
+        SERVER.state.reset()
+        results = make_fetcher(workdir).fetch_all(URLS)
+        check("Unchanged files revalidate with 304", statuses(results) == ["not_modified"] * len(DOCS)
+              and SERVER.state.stats == {304: len(DOCS)}, f"({SERVER.state.stats})")
+
+        SERVER.state.reset()
+        SERVER.state.put(DOCS[0], b"%PDF-1.4 updated KIM")
+        results = make_fetcher(workdir).fetch_all(URLS)
+        updated = open(results[URLS[0]].path, "rb").read() == b"%PDF-1.4 updated KIM"
+        check("Changed file is re-downloaded", results[URLS[0]].status == "downloaded" and updated
+              and statuses(results).count("not_modified") == len(DOCS) - 1)
+
+        SERVER.state.reset()
+        os.remove(os.path.join(workdir, "state.json"))
+        results = make_fetcher(workdir).fetch_all(URLS[1:])
+        check("Local mtime used without stored validators", statuses(results) == ["not_modified"] * (len(DOCS) - 1))
+
+        SERVER.state.reset()
+        before = open(results[URLS[1]].path, "rb").read()
+        SERVER.state.put(DOCS[1], b"%PDF-1.4 new but cut off" * 1000, truncate=True)
+        result = make_fetcher(workdir).fetch(URLS[1])
+        kept = open(result.path, "rb").read() == before
+        check("Truncated download keeps the old copy", result.status == "stale" and kept and not leftovers(workdir),
+              f"({result.status})")
+
+        SERVER.state.put("/new.pdf", b"%PDF-1.4 never completes" * 1000, truncate=True)
+        result = make_fetcher(workdir).fetch(BASE_URL + "/new.pdf")
+        missing = not os.path.exists(os.path.join(workdir, "downloads", "new.pdf"))
+        check("Failed first download leaves no file", result.status == "failed" and missing and not leftovers(workdir))
+
+        SERVER.state.put("/gone.pdf", b"")
+        SERVER.state.configure("/gone.pdf", error_status=404)
+        result = make_fetcher(workdir).fetch(BASE_URL + "/gone.pdf")
+        check("HTTP errors are reported", result.status == "failed" and "404" in (result.error or ""))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n--- FETCHER TEST COMPLETE ---")
+
+
+if __name__ == "__main__":
+    test_fetcher()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from fake_groq_server import start_server
+
+SERVER, BASE_URL = start_server(latency_ms=100, jitter_ms=20)
+# Route every ChatGroq client at the fake server
+os.environ["GROQ_API_BASE"] = BASE_URL
+os.environ.setdefault("GROQ_API_KEY", "fake-key")
+
+from backend.engine.llm_registry import get_llm
+from backend.engine.generation import Generator
+
+PRIMARY = "llama-3.3-70b-versatile"
+FALLBACK = "llama-3.1-8b-instant"
+
+
+def make_generator(**kwargs):
+    options = dict(deadline=5.0, fallback_reserve=1.5, backoff_base=0.05, backoff_max=0.2, hedge_min_delay=0.2)
+    options.update(kwargs)
+    return Generator(lambda api_key, model_name: get_llm(api_key, model_name=model_name), PRIMARY, FALLBACK, **options)
+
+
+def configure(model="*", reset=False, **faults):
+    if reset:
+        SERVER.state.reset()
+    SERVER.state.configure(model, **faults)
+
+
+def primary_requests():
+    return SERVER.state.stats.get(PRIMARY, {}).get("requests", 0)
+
+
+def check(name, ok, detail=""):
+    print(f"CHECK: {name} -> {'PASSED' if ok else 'FAILED'} {detail}")
+
+
+def test_generation():
+    print("--- Generation Policy Test (fake Groq server) ---")
+
+    configure(reset=True)
+    res = make_generator().generate("ping")
+    check("Healthy primary", res.model == PRIMARY and res.attempts == 1, f"({res.model}, attempts={res.attempts})")
+
+    configure(PRIMARY, reset=True, error_rate=0.5, error_status=[429, 503])
+    gen = make_generator(max_retries=4, breaker_failures=100)
+    results = [gen.generate("ping") for _ in range(10)]
+    retried = sum(r.attempts > 1 for r in results)
+    check("Retries on 429/5xx", all(r.model == PRIMARY for r in results) and retried > 0, f"({retried}/10 needed retries)")
+
+    configure(PRIMARY, reset=True, error_rate=1.0, error_status=[500])
+    res = make_generator(breaker_failures=100).generate("ping")
+    check("Fallback after persistent 5xx", res.fallback and res.model == FALLBACK, f"({res.model})")
+
+    configure(PRIMARY, reset=True, error_rate=1.0, error_status=[503])
+    gen = make_generator(max_retries=0, breaker_failures=3, breaker_reset=60)
+    for _ in range(3):
+        gen.generate("ping")
+    before = primary_requests()
+    res = gen.generate("ping")
+    check("Breaker opens and skips primary", gen.breaker.state == "open" and primary_requests() == before and res.fallback,
+          f"(state={gen.breaker.state})")
+
+    # Half-open: one trial call goes to the primary, the backlog waits on its verdict
+    configure(PRIMARY, reset=True, error_rate=1.0, error_status=[503])
+    gen = make_generator(max_retries=0, breaker_failures=3, breaker_reset=0.5)
+    for _ in range(3):
+        gen.generate("ping")
+    time.sleep(0.6)
+    configure(PRIMARY, reset=True, latency_ms=500)
+    with ThreadPoolExecutor(max_workers=10) as callers:
+        results = list(callers.map(lambda _: gen.generate("ping"), range(10)))
+    trials = sum(r.model == PRIMARY for r in results)
+    check("Half-open lets a single trial through", trials == 1 and primary_requests() == 1
+          and gen.breaker.state == "closed", f"({trials} on primary, state={gen.breaker.state})")
+
+    # A user's bad key must not open the shared breaker for everyone else
+    configure(PRIMARY, reset=True, error_rate=1.0, error_status=[401])
+    gen = make_generator(breaker_failures=3)
+    rejected = 0
+    for _ in range(5):
+        try:
+            gen.generate("ping")
+        except Exception:
+            rejected += 1
+    check("Non-retryable errors don't trip the breaker", rejected == 5 and gen.breaker.state == "closed",
+          f"(state={gen.breaker.state})")
+
+    configure(PRIMARY, reset=True, latency_ms=10000)
+    gen = make_generator(deadline=3.0, fallback_reserve=1.0)
+    start = time.monotonic()
+    res = gen.generate("ping")
+    elapsed = time.monotonic() - start
+    check("Deadline hands off to fallback", res.fallback and elapsed < 3.5, f"({elapsed:.2f}s)")
+
+    # More stuck primaries than LLM pool threads: fallbacks must still run in time
+    configure(PRIMARY, reset=True, latency_ms=10000)
+    gen = make_generator(deadline=3.0, fallback_reserve=1.0, breaker_failures=100)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=24) as callers:
+        results = list(callers.map(lambda _: gen.generate("ping"), range(24)))
+    elapsed = time.monotonic() - start
+    check("Fallback runs when the LLM pool is saturated", all(r.fallback for r in results) and elapsed < 4.0,
+          f"({elapsed:.2f}s)")
+
+    configure(reset=True, latency_ms=100, jitter_ms=20)
+    gen = make_generator()
+    for _ in range(25):
+        gen.generate("warmup")
+    configure(PRIMARY, tail_rate=0.5, tail_ms=3000)
+    results = [gen.generate("ping") for _ in range(10)]
+    hedged = sum(r.hedged for r in results)
+    check("Hedging after p95", hedged > 0 and all(r.model == PRIMARY for r in results), f"({hedged}/10 hedged)")
+
+    async def run_async():
+        configure(PRIMARY, reset=True, error_rate=1.0, error_status=[429])
+        gen = make_generator(max_retries=1, breaker_failures=100)
+        res = await gen.agenerate("ping")
+        tokens = [chunk.content async for chunk in gen.astream("ping")]
+        return res, "".join(tokens)
+
+    res, streamed = asyncio.run(run_async())
+    check("Async fallback and streaming", res.fallback and FALLBACK in streamed, f"({res.model})")
+
+    async def run_stalled_stream():
+        configure(PRIMARY, reset=True, latency_ms=10000)
+        gen = make_generator(deadline=3.0, fallback_reserve=1.0)
+        info = {}
+        start = time.monotonic()
+        tokens = [chunk.content async for chunk in gen.astream("ping", info=info)]
+        return info, "".join(tokens), time.monotonic() - start
+
+    info, streamed, elapsed = asyncio.run(run_stalled_stream())
+    check("Stream falls back when the first token misses the deadline",
+          info["fallback"] and FALLBACK in streamed and "timeout" in info["errors"] and elapsed < 3.5,
+          f"({elapsed:.2f}s)")
+
+    SERVER.shutdown()
+    print("\n--- GENERATION TEST COMPLETE ---")
+
+
+if __name__ == "__main__":
+    test_generation()
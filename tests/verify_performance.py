@@ -1,18 +1,17 @@
 import os
 import sys
 import json
-from langchain_groq import ChatGroq
 from langchain_classic.prompts import PromptTemplate
 from dotenv import load_dotenv
 
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from backend.engine.rag_chain import Phase4RAG
+from backend.engine.rag_chain import Phase4RAG, get_llm
 
 load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
 
 def evaluate_metrics(question, context, answer):
-    llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0)
+    llm = get_llm()
     
     # Faithfulness Evaluator
     faithfulness_prompt = PromptTemplate(
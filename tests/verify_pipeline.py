@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.data.pipeline import Pipeline, PipelineAborted, format_summary
+
+QUEUE_SIZE = 2
+
+
+def check(name, ok, detail=""):
+    print(f"CHECK: {name} -> {'PASSED' if ok else 'FAILED'} {detail}")
+
+
+def run_pipeline(n_items, produce_s=0.0, consume_s=0.0, fail_at=None):
+    """Producer thread → this thread → consumer thread; returns (pipeline, max items in flight, consumed)."""
+    pipeline = Pipeline(queue_size=QUEUE_SIZE)
+    pipeline.stage("produce", "items")
+    middle = pipeline.stage("middle", "items")
+    pipeline.stage("consume", "items")
+    first, second = pipeline.queue(), pipeline.queue()
+    lock = threading.Lock()
+    in_flight = max_in_flight = 0
+    consumed = []
+
+    def track(delta):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += delta
+            max_in_flight = max(max_in_flight, in_flight)
+
+    def produce():
+        stats = pipeline.stages["produce"]
+        for i in range(n_items):
+            time.sleep(produce_s)
+            track(1)
+            pipeline.put(first, i, stats)
+            stats.add(units=1)
+        pipeline.close(first)
+
+    def consume():
+        stats = pipeline.stages["consume"]
+        for i in pipeline.consume(second, stats):
+            if i == fail_at:
+                raise RuntimeError(f"consumer failed on {i}")
+            time.sleep(consume_s)
+            consumed.append(i)
+            track(-1)
+            stats.add(units=1)
+
+    with pipeline:
+        pipeline.spawn("produce", produce)
+        pipeline.spawn("consume", consume)
+        middle.begin()
+        for i in pipeline.consume(first, middle):
+            pipeline.put(second, i, middle)
+            middle.add(units=1)
+        pipeline.close(second)
+        middle.end()
+    return pipeline, max_in_flight, consumed
+
+
+def test_pipeline():
+    print("--- Ingest Pipeline Test (bounded queues) ---")
+
+    pipeline, max_in_flight, consumed = run_pipeline(40, consume_s=0.01)
+    check("Every item arrives in order", consumed == list(range(40)))
+    # Two queues plus one item held by each of the three stages
+    check("Slow consumer bounds items in flight", max_in_flight <= 2 * QUEUE_SIZE + 3, f"(max {max_in_flight})")
+    stages = pipeline.summary()["stages"]
+    check("Fast producer is blocked, not buffered", stages["produce"]["blocked_s"] > 0.2,
+          f"({stages['produce']['blocked_s']:.2f}s blocked)")
+    check("Throughput is reported per stage", all(s["units"] == 40 and s["per_s"] for s in stages.values()))
+
+    started = time.perf_counter()
+    run_pipeline(10, produce_s=0.05, consume_s=0.05)
+    elapsed = time.perf_counter() - started
+    check("Stages overlap in time", elapsed < 0.8, f"({elapsed:.2f}s vs 1.0s sequential)")
+
+    pipeline, _, consumed = run_pipeline(10, produce_s=0.05)
+    stages = pipeline.summary()["stages"]
+    check("Slow producer starves the next stage", stages["middle"]["starved_s"] > 0.3,
+          f"({stages['middle']['starved_s']:.2f}s starved)")
+
+    started = time.perf_counter()
+    try:
+        run_pipeline(1000, fail_at=5)
+        check("Stage failure is re-raised", False)
+    except RuntimeError as e:
+        elapsed = time.perf_counter() - started
+        check("Stage failure is re-raised", "failed on 5" in str(e))
+        check("Other stages stop after a failure", elapsed < 2.0, f"({elapsed:.2f}s)")
+    except PipelineAborted:
+        check("Stage failure is re-raised", False, "(got PipelineAborted)")
+
+    summary = pipeline.summary()
+    print(format_summary(summary))
+    check("Peak RSS is reported", sys.platform == "win32" or summary.get("peak_rss_mb", 0) > 0)
+
+    print("\n--- PIPELINE TEST COMPLETE ---")
+
+
+if __name__ == "__main__":
+    test_pipeline()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from fake_source_server import start_server
+from backend.data.scraper import scrape_pages
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "scraper")
+SERVER, BASE_URL = start_server()
+for name in os.listdir(FIXTURES):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        SERVER.state.put("/" + name, f.read(), "text/html; charset=utf-8")
+
+NAV_DELAY_MS = 1500
+
+
+def fund_source(i, **extra):
+    return dict({
+        "url": f"{BASE_URL}/fund_page.html?delay={NAV_DELAY_MS}&fund={i}",
+        "document_type": "Web",
+        "description": f"Test fund {i}",
+    }, **extra)
+
+
+def check(name, ok, detail=""):
+    print(f"CHECK: {name} -> {'PASSED' if ok else 'FAILED'} {detail}")
+
+
+def test_scraper():
+    print("--- Live Page Scraper Test (local HTML fixtures) ---")
+
+    sources = [fund_source(i) for i in range(6)]
+    started = time.perf_counter()
+    results = scrape_pages(sources, concurrency=3, timeout=10)
+    elapsed = time.perf_counter() - started
+    navs = [r.ready and "₹ 1,234.56" in (r.text or "") for r in results]
+    check("Waits for client-side NAV (text:NAV default for Web)", all(navs), f"({sum(navs)}/{len(navs)})")
+    sequential = len(sources) * NAV_DELAY_MS / 1000
+    check("Pages are scraped concurrently", elapsed < sequential * 0.6, f"({elapsed:.1f}s vs {sequential:.1f}s sequential)")
+    check("Results keep source order", [r.url for r in results] == [s["url"] for s in sources])
+
+    [result] = scrape_pages([fund_source(0, wait_for="selector:#nav-value")])
+    check("Selector condition", result.ready and "NAV as on" in result.text, f"({result.elapsed:.1f}s)")
+
+    [result] = scrape_pages([{"url": f"{BASE_URL}/faq_page.html", "document_type": "FAQ", "wait_for": "text:KYC"}])
+    check("Static page is ready without waiting", result.ready and result.elapsed < 1.0, f"({result.elapsed:.2f}s)")
+
+    [result] = scrape_pages([{"url": f"{BASE_URL}/never_ready.html", "document_type": "Web", "timeout_s": "2"}])
+    check("Unmet condition times out per source and keeps the page",
+          not result.ready and result.error is None and "maintenance" in result.text and result.elapsed < 3.0,
+          f"({result.elapsed:.1f}s)")
+
+    [result] = scrape_pages([{"url": "http://127.0.0.1:9/unreachable", "document_type": "Web", "timeout_s": "5"}])
+    check("Navigation failure is reported, not raised", result.error is not None and result.text is None)
+
+    seen = []
+    scrape_pages([fund_source(0), fund_source(1)], on_result=lambda source, result: seen.append(source["url"]))
+    check("on_result called for every source", len(seen) == 2)
+
+    # A callback blocked on a full ingest queue must not stall the other pages' readiness waits
+    fast = dict(fund_source(0), url=f"{BASE_URL}/fund_page.html?delay=100&fund=fast")
+
+    def slow_consumer(source, result):
+        if source is fast:
+            time.sleep(5)
+
+    results = scrape_pages([fast, fund_source(1), fund_source(2)], concurrency=3, timeout=4, on_result=slow_consumer)
+    check("Blocking on_result doesn't stall other pages", all(r.ready for r in results))
+
+    try:
+        scrape_pages([fund_source(0, wait_for="sleep:7")])
+        check("Unknown condition rejected", False)
+    except ValueError:
+        check("Unknown condition rejected", True)
+
+    print("\n--- SCRAPER TEST COMPLETE ---")
+
+
+if __name__ == "__main__":
+    test_scraper()